@@ -0,0 +1,186 @@
+"""
+Admission control and backpressure for the prediction endpoints
+"""
+import asyncio
+import collections
+import contextlib
+import math
+
+class AdmissionRejected(Exception):
+    """Raised when a request is refused; carries the HTTP status and Retry-After hint"""
+
+    def __init__(self, reason, status_code, detail, retry_after=None):
+        super().__init__(detail)
+        self.reason = reason
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Bounds the inference work a worker accepts.
+
+    Every request reserves the rows it will have in flight at once (a batch is
+    predicted one chunk at a time, so at most chunk_rows). Requests that do not
+    fit wait in a bounded FIFO queue for at most max_wait_seconds; when the
+    queue is full or the wait times out they are rejected straight away with
+    429 instead of piling up behind each other. Batches above max_batch_rows
+    are rejected with 413, from the raw body before it is parsed where the
+    caller checks it (check_body_size, check_body_rows), so an oversized
+    payload costs no validation work.
+
+    All methods run on the event loop, so no locking is needed.
+    """
+
+    def __init__(self, max_batch_rows=1000, max_inflight_rows=2000, max_queue_size=100,
+                 max_wait_seconds=2.0, chunk_rows=256, retry_after_seconds=1, max_row_bytes=512):
+        self.max_batch_rows = max_batch_rows
+        self.max_inflight_rows = max_inflight_rows
+        self.max_queue_size = max_queue_size
+        self.max_wait_seconds = max_wait_seconds
+        self.chunk_rows = chunk_rows
+        self.retry_after_seconds = retry_after_seconds
+        self.max_row_bytes = max_row_bytes
+        self._waiters = collections.deque()
+        self._inflight_rows = 0
+        self._admitted = 0
+        self._queued = 0
+        self._max_queue_depth = 0
+        self._rejected = {"batch_too_large": 0, "queue_full": 0, "queue_timeout": 0}
+
+    def chunks(self, n_rows):
+        """Yield (start, end) row ranges of at most chunk_rows"""
+        for start in range(0, n_rows, self.chunk_rows):
+            yield start, min(start + self.chunk_rows, n_rows)
+
+    def _queue_depth(self):
+        return sum(1 for _, future in self._waiters if not future.done())
+
+    def _retry_after(self):
+        # Scale the hint with how far the queue is backed up
+        backlog = self._queue_depth() / max(self.max_queue_size, 1)
+        return max(1, math.ceil(self.retry_after_seconds * (1 + backlog)))
+
+    def _reject(self, reason, status_code, detail, retry=True):
+        self._rejected[reason] += 1
+        return AdmissionRejected(reason, status_code, detail, self._retry_after() if retry else None)
+
+    def _fits(self, rows):
+        return self._inflight_rows + rows <= self.max_inflight_rows
+
+    def _wake_waiters(self):
+        while self._waiters:
+            rows, future = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if not self._fits(rows):
+                break
+            self._waiters.popleft()
+            self._inflight_rows += rows
+            future.set_result(True)
+
+    def check_body_size(self, n_bytes):
+        """
+        Reject a batch body too large to hold max_batch_rows rows of max_row_bytes.
+
+        Raises:
+            AdmissionRejected: If the body exceeds the limit.
+        """
+        max_bytes = self.max_batch_rows * self.max_row_bytes
+        if n_bytes > max_bytes:
+            raise self._reject("batch_too_large", 413,
+                               f"Request body of {n_bytes} bytes exceeds the limit of {max_bytes}",
+                               retry=False)
+
+    def check_body_rows(self, body):
+        """
+        Reject a JSON batch body with more than max_batch_rows objects, before it is parsed.
+
+        Raises:
+            AdmissionRejected: If the body holds too many rows.
+        """
+        # Every row is one JSON object, so counting braces bounds the row count
+        n_rows = body.count(b"{")
+        if n_rows > self.max_batch_rows:
+            raise self._reject("batch_too_large", 413,
+                               f"Batch of {n_rows} rows exceeds the limit of {self.max_batch_rows}",
+                               retry=False)
+
+    async def acquire(self, n_rows):
+        """
+        Reserve in-flight capacity for a request of n_rows.
+
+        Returns:
+            int: Rows reserved, to be passed back to release().
+
+        Raises:
+            AdmissionRejected: If the batch is too large, the queue is full or the wait times out.
+        """
+        if n_rows > self.max_batch_rows:
+            raise self._reject("batch_too_large", 413,
+                               f"Batch of {n_rows} rows exceeds the limit of {self.max_batch_rows}",
+                               retry=False)
+
+        rows = max(1, min(n_rows, self.chunk_rows, self.max_inflight_rows))
+        if not self._waiters and self._fits(rows):
+            self._inflight_rows += rows
+            self._admitted += 1
+            return rows
+
+        if self._queue_depth() >= self.max_queue_size:
+            raise self._reject("queue_full", 429, "Server is at capacity, retry later")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((rows, future))
+        self._queued += 1
+        self._max_queue_depth = max(self._max_queue_depth, self._queue_depth())
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Capacity was granted just as the wait expired
+                self._admitted += 1
+                return rows
+            future.cancel()
+            self._wake_waiters()
+            raise self._reject("queue_timeout", 429, "Timed out waiting for capacity, retry later")
+        except asyncio.CancelledError:
+            # Client went away while queued; hand back capacity granted in the meantime
+            if future.done() and not future.cancelled():
+                self.release(rows)
+            else:
+                future.cancel()
+            raise
+        self._admitted += 1
+        return rows
+
+    def release(self, rows):
+        """Return reserved capacity and admit queued requests that now fit"""
+        self._inflight_rows -= rows
+        self._wake_waiters()
+
+    @contextlib.asynccontextmanager
+    async def admit(self, n_rows):
+        """Async context manager holding capacity for a request of n_rows"""
+        rows = await self.acquire(n_rows)
+        try:
+            yield rows
+        finally:
+            self.release(rows)
+
+    def stats(self):
+        """Return current load and admission counters"""
+        return {
+            "max_batch_rows": self.max_batch_rows,
+            "max_row_bytes": self.max_row_bytes,
+            "max_inflight_rows": self.max_inflight_rows,
+            "max_queue_size": self.max_queue_size,
+            "chunk_rows": self.chunk_rows,
+            "inflight_rows": self._inflight_rows,
+            "queue_depth": self._queue_depth(),
+            "max_queue_depth": self._max_queue_depth,
+            "admitted_requests": self._admitted,
+            "queued_requests": self._queued,
+            "rejected_requests": dict(self._rejected)
+        }
@@ -1,16 +1,33 @@
 """
 FastAPI Application for Crop Recommendation Prediction
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 import pickle
 import numpy as np
 import pandas as pd
-from typing import Dict, List
+from typing import Dict, List, Union
 import os
+import sys
+import random
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, APP_DIR)
+# Pipeline modules shared with the API (src/ sits next to app/ locally and in Docker)
+sys.path.insert(0, os.path.join(APP_DIR, "..", "src"))
+
+from shadow import ShadowScorer
+from admission import AdmissionController, AdmissionRejected
+from prediction_log import PredictionLogger
+from drift_sketch import FeatureSketch
+from feature_transform import FeatureTransform
+from flat_forest import FlatForest, publish_segment, current_segment
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -55,12 +72,15 @@ class CropFeatures(BaseModel):
 class CropPrediction(BaseModel):
     predicted_crop: str
     confidence: float
-    top_3_predictions: List[Dict[str, float]]
+    top_3_predictions: List[Dict[str, Union[str, float]]]
     input_features: Dict[str, float]
+    model_variant: str = "primary"
 
 # Global variable for model
 model = None
 feature_names = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+# Shared pipeline transform; identity over feature_names until the fitted one is loaded
+feature_transform = FeatureTransform().fit(pd.DataFrame(columns=feature_names))
 crop_classes = [
     'rice', 'maize', 'chickpea', 'kidneybeans', 'pigeonpeas', 'mothbeans',
     'mungbean', 'blackgram', 'lentil', 'pomegranate', 'banana', 'mango',
@@ -68,35 +88,370 @@ crop_classes = [
     'coconut', 'cotton', 'jute', 'coffee'
 ]
 
-def load_model():
-    """Load the trained model"""
-    global model
+# pickle: each worker unpickles its own model; shared: workers memory-map one
+# published copy of the forest's node arrays (see src/flat_forest.py)
+MODEL_SERVING_MODE = os.getenv("MODEL_SERVING_MODE", "pickle")
+SHARED_MODEL_DIR = os.getenv("SHARED_MODEL_DIR")
+# How often workers check for a newly published shared segment
+SHARED_MODEL_CHECK_SECONDS = float(os.getenv("SHARED_MODEL_CHECK_SECONDS", "5"))
+shared_model_dir = None
+shared_segment = None
+shared_checked_at = 0.0
+
+# Early-exit inference: stop evaluating trees once a row's vote is decided
+# (disabled unless a confidence is set; 1.0 keeps the full forest's argmax exactly)
+EARLY_EXIT_CONFIDENCE = os.getenv("EARLY_EXIT_CONFIDENCE")
+EARLY_EXIT_CONFIDENCE = float(EARLY_EXIT_CONFIDENCE) if EARLY_EXIT_CONFIDENCE else None
+EARLY_EXIT_CHUNK_SIZE = int(os.getenv("EARLY_EXIT_CHUNK_SIZE", "10"))
+early_exit_forest = None
+early_exit_stats = {"rows": 0, "trees_evaluated": 0}
+early_exit_lock = threading.Lock()
+
+# Candidate model for shadow scoring and A/B routing (disabled unless a path is set)
+candidate_model = None
+CANDIDATE_MODEL_PATH = os.getenv("CANDIDATE_MODEL_PATH")
+# Fraction of requests also scored by the model that did not serve them
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+# Fraction of requests served by the candidate instead of the primary model
+AB_CANDIDATE_WEIGHT = float(os.getenv("AB_CANDIDATE_WEIGHT", "0.0"))
+shadow_scorer = ShadowScorer(max_queue_size=int(os.getenv("SHADOW_QUEUE_SIZE", "1000")))
+
+# Limits on inference work accepted by this worker; excess requests get 413/429
+admission = AdmissionController(
+    max_batch_rows=int(os.getenv("ADMISSION_MAX_BATCH_ROWS", "1000")),
+    max_inflight_rows=int(os.getenv("ADMISSION_MAX_INFLIGHT_ROWS", "2000")),
+    max_queue_size=int(os.getenv("ADMISSION_MAX_QUEUE", "100")),
+    max_wait_seconds=float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "2.0")),
+    chunk_rows=int(os.getenv("ADMISSION_CHUNK_ROWS", "256")),
+    retry_after_seconds=int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1")),
+    max_row_bytes=int(os.getenv("ADMISSION_MAX_ROW_BYTES", "512"))
+)
+
+class BatchPayloadLimit:
+    """
+    ASGI middleware that rejects oversized /predict/batch bodies with 413
+    before FastAPI parses and validates them.
+
+    The body is checked against the admission byte limit as it arrives (and
+    up front from Content-Length), then its rows are counted in the raw bytes.
+    Accepted bodies are replayed to the application unchanged; the endpoint
+    still enforces the row limit as a backstop.
+    """
+
+    def __init__(self, app, path="/predict/batch"):
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+        
+        messages = []
+        try:
+            content_length = dict(scope["headers"]).get(b"content-length")
+            if content_length is not None and content_length.isdigit():
+                admission.check_body_size(int(content_length))
+            chunks, n_bytes, more_body = [], 0, True
+            while more_body:
+                message = await receive()
+                messages.append(message)
+                if message["type"] != "http.request":
+                    break
+                chunks.append(message.get("body", b""))
+                n_bytes += len(chunks[-1])
+                admission.check_body_size(n_bytes)
+                more_body = message.get("more_body", False)
+            admission.check_body_rows(b"".join(chunks))
+        except AdmissionRejected as e:
+            response = JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+            await response(scope, receive, send)
+            return
+        
+        async def replay():
+            return messages.pop(0) if messages else await receive()
+        
+        await self.app(scope, replay, send)
+
+app.add_middleware(BatchPayloadLimit)
+
+# Streaming input sketches compared against the training reference sketch
+reference_sketch = None
+live_sketch = None
+drift_lock = threading.Lock()
+
+# Append-only prediction log (disabled unless a path is set)
+PREDICTION_LOG_PATH = os.getenv("PREDICTION_LOG_PATH")
+prediction_logger = None
+if PREDICTION_LOG_PATH:
+    prediction_logger = PredictionLogger(
+        PREDICTION_LOG_PATH,
+        buffer_size=int(os.getenv("PREDICTION_LOG_BUFFER_SIZE", "10000")),
+        batch_size=int(os.getenv("PREDICTION_LOG_BATCH_SIZE", "500")),
+        flush_interval=float(os.getenv("PREDICTION_LOG_FLUSH_SECONDS", "1.0")),
+        max_bytes=int(os.getenv("PREDICTION_LOG_MAX_BYTES", str(50 * 1024 * 1024))),
+        rotate_interval=float(os.getenv("PREDICTION_LOG_ROTATE_SECONDS", "3600")),
+        compress=os.getenv("PREDICTION_LOG_COMPRESS", "true").lower() == "true"
+    )
+
+def find_model_artifact(filename, verbose=True):
+    """Return the first existing path of a file in the models directory, or None"""
     # Try multiple paths for model location
     possible_paths = [
-        "/app/models/model.pkl",  # Docker container path
-        os.path.join("..", "models", "model.pkl"),  # Local development path
-        "models/model.pkl",  # Current directory
-        os.path.join(os.path.dirname(__file__), "..", "models", "model.pkl")  # Relative to app dir
+        os.path.join("/app/models", filename),  # Docker container path
+        os.path.join("..", "models", filename),  # Local development path
+        os.path.join("models", filename),  # Current directory
+        os.path.join(os.path.dirname(__file__), "..", "models", filename)  # Relative to app dir
     ]
     
-    model_path = None
     for path in possible_paths:
         if os.path.exists(path):
-            model_path = path
-            break
+            return path
     
-    if model_path is None:
-        print(f"Model file not found. Searched paths:")
+    if verbose:
+        print(f"{filename} not found. Searched paths:")
         for path in possible_paths:
             print(f"  - {path} (exists: {os.path.exists(path)})")
+    return None
+
+def find_serving_model():
+    """Prefer the pruned serving model written by the model_pruning stage over the full model"""
+    return find_model_artifact("serving_model.pkl", verbose=False) or find_model_artifact("model.pkl")
+
+def load_model():
+    """Load the trained model"""
+    global model
+    if MODEL_SERVING_MODE == "shared":
+        return load_shared_model()
+    
+    model_path = find_serving_model()
+    
+    if model_path is None:
         raise FileNotFoundError("Model file not found in any expected location")
     
     print(f"Loading model from: {model_path}")
     with open(model_path, "rb") as f:
-        model = pickle.load(f)
+        loaded_model = pickle.load(f)
+    
+    load_feature_transform(loaded_model)
+    prepare_early_exit(loaded_model)
+    model = loaded_model
+    return model
+
+def load_shared_model():
+    """Map the current shared model segment, publishing one from model.pkl if none exists yet"""
+    global model, shared_model_dir, shared_segment, shared_checked_at
+    if shared_model_dir is None:
+        if SHARED_MODEL_DIR:
+            shared_model_dir = SHARED_MODEL_DIR
+        else:
+            model_path = find_serving_model()
+            if model_path is None:
+                raise FileNotFoundError("Model file not found in any expected location")
+            shared_model_dir = os.path.join(os.path.dirname(model_path), "shared")
+    
+    segment = current_segment(shared_model_dir)
+    if segment is None:
+        model_path = find_serving_model()
+        if model_path is None:
+            raise FileNotFoundError("No shared model segment and no model file to publish from")
+        print(f"Publishing shared model segment from: {model_path}")
+        segment = publish_segment(model_path, shared_model_dir)
     
+    print(f"Mapping shared model segment: {os.path.join(shared_model_dir, segment)}")
+    loaded_model = FlatForest.load(os.path.join(shared_model_dir, segment))
+    load_feature_transform(loaded_model)
+    prepare_early_exit(loaded_model)
+    model = loaded_model
+    shared_segment = segment
+    shared_checked_at = time.monotonic()
     return model
 
+def refresh_shared_model(force=False):
+    """Switch to a newly published shared segment; checks at most every SHARED_MODEL_CHECK_SECONDS"""
+    global shared_checked_at
+    if MODEL_SERVING_MODE != "shared" or shared_model_dir is None:
+        return False
+    now = time.monotonic()
+    if not force and now - shared_checked_at < SHARED_MODEL_CHECK_SECONDS:
+        return False
+    shared_checked_at = now
+    
+    segment = current_segment(shared_model_dir)
+    if segment is None or segment == shared_segment:
+        return False
+    try:
+        load_shared_model()
+    except Exception as e:
+        print(f"Error switching to shared segment {segment}: {e}")
+        return False
+    print(f"Switched to shared model segment {segment}")
+    return True
+
+def prepare_early_exit(loaded_model):
+    """Keep a flat copy of the primary model for early-exit inference when it is enabled"""
+    global early_exit_forest
+    if EARLY_EXIT_CONFIDENCE is None:
+        early_exit_forest = None
+    elif isinstance(loaded_model, FlatForest):
+        early_exit_forest = loaded_model
+    else:
+        early_exit_forest = FlatForest.from_model(loaded_model)
+    return early_exit_forest
+
+def process_memory():
+    """Resident memory of this worker process in MB (private vs file-backed on Linux)"""
+    memory = {"pid": os.getpid()}
+    fields = {"VmRSS": "rss_mb", "RssAnon": "rss_anon_mb", "RssFile": "rss_file_mb", "RssShmem": "rss_shmem_mb"}
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in fields:
+                    memory[fields[key]] = round(int(value.split()[0]) / 1024, 2)
+    except OSError:
+        import resource
+        memory["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2)
+    return memory
+
+def load_feature_transform(trained_model):
+    """Load the feature transform saved by the pipeline and check it matches the model"""
+    global feature_transform
+    transform_path = find_model_artifact("feature_transform.pkl")
+    if transform_path is None:
+        print("Feature transform not found, using raw input features.")
+        return feature_transform
+    
+    with open(transform_path, "rb") as f:
+        transform = pickle.load(f)
+    
+    check_feature_transform(trained_model, transform, transform_path)
+    feature_transform = transform
+    return feature_transform
+
+def check_feature_transform(trained_model, transform, transform_source):
+    """Raise if the model was trained with a different feature transform version"""
+    model_version = getattr(trained_model, "feature_transform_version_", None)
+    if model_version is not None and model_version != transform.version:
+        raise ValueError(f"Model was trained with feature transform {model_version}, "
+                         f"but {transform_source} is {transform.version}")
+
+def build_model_input(features_list):
+    """
+    Builds raw and transformed model inputs for a batch of requests.
+
+    Returns:
+        tuple: Raw inputs (rows x input features) and the transformed feature matrix.
+    """
+    names = feature_transform.input_names
+    raw = np.array([[getattr(features, name) for name in names] for features in features_list],
+                   dtype=np.float32)
+    return raw, feature_transform.transform(raw)
+
+def predict_rows(serving_model, input_data):
+    """
+    Predicts a batch in one call.
+
+    The primary model uses early-exit inference when EARLY_EXIT_CONFIDENCE is
+    set; probabilities are then averaged over the trees each row evaluated.
+
+    Returns:
+        tuple: Predicted class index per row and the class probability matrix.
+    """
+    if early_exit_forest is not None and serving_model is model:
+        columns, probabilities, trees_used = early_exit_forest.predict_early_exit(
+            input_data, confidence=EARLY_EXIT_CONFIDENCE, chunk_size=EARLY_EXIT_CHUNK_SIZE
+        )
+        with early_exit_lock:
+            early_exit_stats["rows"] += len(trees_used)
+            early_exit_stats["trees_evaluated"] += int(trees_used.sum())
+        return columns, probabilities
+    
+    probabilities = serving_model.predict_proba(input_data)
+    return np.argmax(probabilities, axis=1), probabilities
+
+async def admit_request(n_rows):
+    """Reserve inference capacity, turning an admission rejection into an HTTP error"""
+    try:
+        return await admission.acquire(n_rows)
+    except AdmissionRejected as e:
+        headers = {"Retry-After": str(e.retry_after)} if e.retry_after is not None else None
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=headers)
+
+async def predict_in_chunks(serving_model, input_data):
+    """
+    Predicts a batch chunk by chunk in the threadpool.
+
+    The event loop is free between chunks, so other requests are admitted
+    and served while a large batch is being predicted.
+    """
+    columns, probabilities = [], []
+    for start, end in admission.chunks(len(input_data)):
+        chunk_columns, chunk_probabilities = await run_in_threadpool(
+            predict_rows, serving_model, input_data[start:end]
+        )
+        columns.append(chunk_columns)
+        probabilities.append(chunk_probabilities)
+    return np.concatenate(columns), np.vstack(probabilities)
+
+def load_reference_sketch():
+    """Load the training reference sketch and start an empty live sketch with the same bins"""
+    global reference_sketch, live_sketch
+    sketch_path = find_model_artifact("reference_sketch.json")
+    if sketch_path is None:
+        raise FileNotFoundError("Reference sketch not found in any expected location")
+    
+    reference_sketch = FeatureSketch.load(sketch_path)
+    live_sketch = reference_sketch.empty_like()
+    return reference_sketch
+
+def record_inputs(input_data):
+    """Add served inputs to the live drift sketch"""
+    if live_sketch is not None:
+        with drift_lock:
+            live_sketch.update(input_data)
+
+def log_prediction(endpoint, payload, predicted, variant, started):
+    """Buffer a prediction record for the background log writer"""
+    if prediction_logger is not None:
+        prediction_logger.log({
+            "ts": time.time(),
+            "endpoint": endpoint,
+            "payload": payload,
+            "predicted": predicted,
+            "model_variant": variant,
+            "latency_ms": (time.perf_counter() - started) * 1000
+        })
+
+def load_candidate_model():
+    """Load the candidate model configured by CANDIDATE_MODEL_PATH, refusing one built for other features"""
+    global candidate_model
+    if not CANDIDATE_MODEL_PATH:
+        return None
+    
+    print(f"Loading candidate model from: {CANDIDATE_MODEL_PATH}")
+    with open(CANDIDATE_MODEL_PATH, "rb") as f:
+        loaded_model = pickle.load(f)
+    
+    # The candidate is fed the primary's transformed inputs
+    check_feature_transform(loaded_model, feature_transform, "the serving feature transform")
+    candidate_model = loaded_model
+    shadow_scorer.start()
+    return candidate_model
+
+def route_request():
+    """Pick the model that serves a request according to the A/B weight"""
+    if candidate_model is not None and random.random() < AB_CANDIDATE_WEIGHT:
+        return candidate_model, "candidate"
+    return model, "primary"
+
+def schedule_shadow_scoring(background_tasks, input_data, probabilities, variant):
+    """Queue a sampled request for shadow scoring once the response has been sent"""
+    if candidate_model is not None and random.random() < SHADOW_SAMPLE_RATE:
+        background_tasks.add_task(
+            shadow_scorer.submit, model, candidate_model, input_data, probabilities, variant
+        )
+
 @app.on_event("startup")
 async def startup_event():
     """Load model on startup"""
@@ -106,6 +461,28 @@ async def startup_event():
     except Exception as e:
         print(f"Error loading model: {e}")
         print("Make sure to train the model first using: dvc repro")
+    
+    try:
+        load_reference_sketch()
+        print("Reference sketch loaded, drift monitoring enabled.")
+    except Exception as e:
+        print(f"Drift monitoring disabled: {e}")
+    
+    try:
+        if load_candidate_model() is not None:
+            print("Candidate model loaded successfully!")
+    except Exception as e:
+        print(f"Error loading candidate model: {e}")
+    
+    if prediction_logger is not None:
+        prediction_logger.start()
+        print(f"Logging predictions to: {PREDICTION_LOG_PATH}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush buffered prediction records"""
+    if prediction_logger is not None:
+        prediction_logger.close()
 
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -168,12 +545,110 @@ async def model_info():
         "max_depth": model.max_depth,
         "n_features": len(feature_names),
         "feature_names": feature_names,
+        "model_features": feature_transform.output_names,
+        "feature_transform_version": feature_transform.version,
         "n_classes": len(crop_classes),
         "crop_classes": crop_classes
     }
 
+@app.get("/model/memory")
+async def model_memory():
+    """Report this worker's memory usage and how the model is held"""
+    return {
+        "serving_mode": MODEL_SERVING_MODE,
+        "shared_segment": shared_segment,
+        "model_array_mb": round(model.nbytes / (1024 ** 2), 2) if isinstance(model, FlatForest) else None,
+        "process": process_memory()
+    }
+
+@app.post("/model/reload")
+async def reload_model():
+    """Reload the model, or switch this worker to the latest published shared segment"""
+    try:
+        if MODEL_SERVING_MODE == "shared":
+            switched = refresh_shared_model(force=True)
+            return {"reloaded": switched, "shared_segment": shared_segment}
+        load_model()
+        return {"reloaded": True}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload error: {e}")
+
+@app.get("/model/early-exit")
+async def early_exit_info():
+    """Get early-exit configuration and the average number of trees evaluated per row"""
+    with early_exit_lock:
+        rows = early_exit_stats["rows"]
+        trees_evaluated = early_exit_stats["trees_evaluated"]
+    return {
+        "enabled": early_exit_forest is not None,
+        "confidence": EARLY_EXIT_CONFIDENCE,
+        "chunk_size": EARLY_EXIT_CHUNK_SIZE,
+        "n_trees": early_exit_forest.n_estimators if early_exit_forest is not None else None,
+        "rows": rows,
+        "avg_trees_per_row": trees_evaluated / rows if rows else None
+    }
+
+@app.get("/model/shadow")
+async def shadow_info():
+    """Get candidate model routing configuration and shadow comparison statistics"""
+    return {
+        "candidate_loaded": candidate_model is not None,
+        "candidate_model_path": CANDIDATE_MODEL_PATH,
+        "shadow_sample_rate": SHADOW_SAMPLE_RATE,
+        "ab_candidate_weight": AB_CANDIDATE_WEIGHT,
+        "stats": shadow_scorer.stats()
+    }
+
+@app.get("/monitoring/drift")
+async def drift_report():
+    """Get per-feature drift scores of live inputs versus the training distribution"""
+    if reference_sketch is None:
+        raise HTTPException(status_code=503, detail="Reference sketch not loaded")
+    
+    quantile_levels = [0.05, 0.5, 0.95]
+    with drift_lock:
+        scores = live_sketch.drift_scores(reference_sketch)
+        live_quantiles = live_sketch.quantiles(quantile_levels)
+        n_rows = live_sketch.n_rows
+    reference_quantiles = reference_sketch.quantiles(quantile_levels)
+    
+    features = {}
+    for j, name in enumerate(reference_sketch.feature_names):
+        features[name] = {
+            **scores[name],
+            "live_quantiles": dict(zip(["p05", "p50", "p95"], live_quantiles[j].tolist())) if n_rows else None,
+            "reference_quantiles": dict(zip(["p05", "p50", "p95"], reference_quantiles[j].tolist()))
+        }
+    
+    return {
+        "live_rows": n_rows,
+        "reference_rows": reference_sketch.n_rows,
+        "features": features
+    }
+
+@app.post("/monitoring/drift/reset")
+async def reset_drift():
+    """Start a new drift monitoring window"""
+    if live_sketch is None:
+        raise HTTPException(status_code=503, detail="Reference sketch not loaded")
+    with drift_lock:
+        live_sketch.reset()
+    return {"status": "reset"}
+
+@app.get("/monitoring/admission")
+async def admission_info():
+    """Get admission limits, in-flight rows, queue depth and reject counts"""
+    return admission.stats()
+
+@app.get("/monitoring/prediction-log")
+async def prediction_log_info():
+    """Get prediction log buffer and writer statistics"""
+    if prediction_logger is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_logger.stats()}
+
 @app.post("/predict", response_model=CropPrediction)
-async def predict_crop(features: CropFeatures):
+async def predict_crop(features: CropFeatures, background_tasks: BackgroundTasks):
     """
     Predict suitable crop based on input features
     
@@ -186,23 +661,19 @@ async def predict_crop(features: CropFeatures):
     if model is None:
         raise HTTPException(status_code=503, detail="Model not loaded. Please train the model first.")
     
+    started = time.perf_counter()
+    refresh_shared_model()
+    serving_model, variant = route_request()
+    admitted_rows = await admit_request(1)
+    
     try:
         # Prepare input data
-        input_data = np.array([[
-            features.N,
-            features.P,
-            features.K,
-            features.temperature,
-            features.humidity,
-            features.ph,
-            features.rainfall
-        ]])
-        
-        # Make prediction
-        prediction_idx = model.predict(input_data)[0]
+        raw_input, input_data = build_model_input([features])
         
-        # Get prediction probabilities
-        probabilities = model.predict_proba(input_data)[0]
+        # Make prediction and get prediction probabilities
+        prediction_columns, batch_probabilities = await predict_in_chunks(serving_model, input_data)
+        probabilities = batch_probabilities[0]
+        prediction_idx = serving_model.classes_[prediction_columns[0]]
         
         # Convert numeric prediction to crop name
         # The model predicts indices (0, 1, 2...), map to crop names
@@ -223,7 +694,11 @@ async def predict_crop(features: CropFeatures):
         ]
         
         # Get confidence for predicted class
-        confidence = float(probabilities[int(prediction_idx)])
+        confidence = float(probabilities[prediction_columns[0]])
+        
+        record_inputs(raw_input)
+        schedule_shadow_scoring(background_tasks, input_data, batch_probabilities, variant)
+        log_prediction("/predict", features.dict(), predicted_crop, variant, started)
         
         return CropPrediction(
             predicted_crop=predicted_crop,
@@ -237,7 +712,8 @@ async def predict_crop(features: CropFeatures):
                 "humidity": features.humidity,
                 "ph": features.ph,
                 "rainfall": features.rainfall
-            }
+            },
+            model_variant=variant
         )
         
     except Exception as e:
@@ -245,9 +721,11 @@ async def predict_crop(features: CropFeatures):
         error_detail = f"Prediction error: {str(e)}\n{traceback.format_exc()}"
         print(error_detail)  # Log to console
         raise HTTPException(status_code=500, detail=error_detail)
+    finally:
+        admission.release(admitted_rows)
 
 @app.post("/predict/batch")
-async def predict_batch(features_list: List[CropFeatures]):
+async def predict_batch(features_list: List[CropFeatures], background_tasks: BackgroundTasks):
     """
     Predict crops for multiple samples
     
@@ -260,39 +738,51 @@ async def predict_batch(features_list: List[CropFeatures]):
     if model is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
+    started = time.perf_counter()
+    refresh_shared_model()
+    serving_model, variant = route_request()
+    admitted_rows = await admit_request(len(features_list))
+    
     try:
         predictions = []
-        for features in features_list:
-            # Prepare input data
-            input_data = np.array([[
-                features.N, features.P, features.K,
-                features.temperature, features.humidity,
-                features.ph, features.rainfall
-            ]])
-            
-            # Make prediction
-            prediction_idx = model.predict(input_data)[0]
-            probabilities = model.predict_proba(input_data)[0]
+        if features_list:
+            # Prepare input data and predict the batch in chunks
+            raw_input, input_data = build_model_input(features_list)
+            prediction_columns, probabilities = await predict_in_chunks(serving_model, input_data)
+            prediction_values = serving_model.classes_[prediction_columns]
+            confidences = probabilities[np.arange(len(prediction_columns)), prediction_columns]
             
-            # Convert numeric prediction to crop name
-            if isinstance(prediction_idx, (int, np.integer)):
-                predicted_crop = crop_classes[int(prediction_idx)]
-            else:
-                predicted_crop = str(prediction_idx)
-            
-            confidence = float(probabilities[int(prediction_idx)])
-            
-            predictions.append({
-                "predicted_crop": predicted_crop,
-                "confidence": confidence,
-                "input_features": features.dict()
-            })
+            for features, prediction_idx, confidence in zip(features_list, prediction_values, confidences):
+                # Convert numeric prediction to crop name
+                if isinstance(prediction_idx, (int, np.integer)):
+                    predicted_crop = crop_classes[int(prediction_idx)]
+                else:
+                    predicted_crop = str(prediction_idx)
+                
+                predictions.append({
+                    "predicted_crop": predicted_crop,
+                    "confidence": float(confidence),
+                    "input_features": features.dict()
+                })
+        
+        if predictions:
+            record_inputs(raw_input)
+            schedule_shadow_scoring(background_tasks, input_data, probabilities, variant)
+            log_prediction(
+                "/predict/batch",
+                [p["input_features"] for p in predictions],
+                [p["predicted_crop"] for p in predictions],
+                variant,
+                started
+            )
         
-        return {"predictions": predictions, "count": len(predictions)}
+        return {"predictions": predictions, "count": len(predictions), "model_variant": variant}
         
     except Exception as e:
         import traceback
         error_detail = f"Batch prediction error: {str(e)}\n{traceback.format_exc()}"
         print(error_detail)  # Log to console
         raise HTTPException(status_code=500, detail=error_detail)
+    finally:
+        admission.release(admitted_rows)
 
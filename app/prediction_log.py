@@ -0,0 +1,141 @@
+"""
+Append-only prediction log with a bounded in-memory buffer and background writer
+"""
+import collections
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+
+class PredictionLogger:
+    """
+    Buffers prediction records in memory and writes them as JSON lines in batches.
+
+    log() only appends to a bounded buffer under a lock; serialization, file
+    writes, rotation and compression all happen on the writer thread. When the
+    buffer is full new records are dropped and counted rather than blocking the
+    request that produced them.
+    """
+
+    def __init__(self, path, buffer_size=10000, batch_size=500, flush_interval=1.0,
+                 max_bytes=50 * 1024 * 1024, rotate_interval=3600, compress=True):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.compress = compress
+
+        self._buffer = collections.deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._worker = None
+        self._file = None
+        self._opened_at = None
+        self._logged = 0
+        self._dropped = 0
+        self._written = 0
+        self._rotations = 0
+        self._write_errors = 0
+
+    def start(self):
+        """Open the log file and start the writer thread"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._open()
+        self._stopping = False
+        self._worker = threading.Thread(target=self._run, name="prediction-log-writer", daemon=True)
+        self._worker.start()
+
+    def log(self, record):
+        """
+        Queue a record for writing without blocking.
+
+        Returns:
+            bool: True if buffered, False if dropped because the buffer is full.
+        """
+        with self._lock:
+            if len(self._buffer) >= self.buffer_size:
+                self._dropped += 1
+                return False
+            self._buffer.append(record)
+            self._logged += 1
+            pending = len(self._buffer)
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def close(self):
+        """Flush buffered records and stop the writer thread"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._worker is not None:
+            self._worker.join(timeout=10)
+            self._worker = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self._flush()
+                self._maybe_rotate()
+            except Exception as e:
+                print(f"Prediction log write error: {e}")
+                self._write_errors += 1
+            if self._stopping:
+                self._flush()
+                return
+
+    def _flush(self):
+        with self._lock:
+            if not self._buffer:
+                return
+            records = self._buffer
+            self._buffer = collections.deque()
+        lines = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+        self._file.write(lines)
+        self._file.flush()
+        self._written += len(records)
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._opened_at = time.time()
+
+    def _maybe_rotate(self):
+        too_big = self._file.tell() >= self.max_bytes
+        too_old = time.time() - self._opened_at >= self.rotate_interval
+        if not (too_big or too_old) or self._file.tell() == 0:
+            return
+
+        self._file.close()
+        stem, ext = os.path.splitext(self.path)
+        rotated = f"{stem}-{time.strftime('%Y%m%d-%H%M%S')}-{self._rotations}{ext}"
+        os.replace(self.path, rotated)
+        if self.compress:
+            with open(rotated, "rb") as src, gzip.open(rotated + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(rotated)
+        self._rotations += 1
+        self._open()
+
+    def stats(self):
+        """Return buffer and writer counters"""
+        with self._lock:
+            buffered = len(self._buffer)
+        return {
+            "path": self.path,
+            "buffered": buffered,
+            "buffer_size": self.buffer_size,
+            "logged": self._logged,
+            "dropped": self._dropped,
+            "written": self._written,
+            "rotations": self._rotations,
+            "write_errors": self._write_errors
+        }
@@ -0,0 +1,103 @@
+"""
+Replay a captured prediction log against the API as a load test
+
+Usage:
+    python app/replay_predictions.py logs/predictions*.jsonl* --url http://localhost:8000 --speed 1.0
+"""
+import argparse
+import glob
+import gzip
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+
+def read_records(patterns, limit=None):
+    """Read prediction records from plain or gzip-compressed JSON lines files, oldest first"""
+    paths = sorted({path for pattern in patterns for path in glob.glob(pattern)})
+    records = []
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+    records.sort(key=lambda record: record["ts"])
+    return records[:limit] if limit else records
+
+def replay(records, base_url, concurrency=8, speed=1.0, timeout=10.0):
+    """
+    Sends the logged requests to the API.
+
+    Args:
+        records: Prediction log records.
+        base_url: API base URL.
+        concurrency: Number of client threads.
+        speed: Replay speed relative to the original inter-arrival times;
+            0 sends requests as fast as possible.
+
+    Returns:
+        dict: Request counts, status codes and latency percentiles.
+    """
+    local = threading.local()
+    first_ts = records[0]["ts"] if records else 0.0
+    start = time.perf_counter()
+
+    def send(record):
+        if speed > 0:
+            delay = (record["ts"] - first_ts) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        sent = time.perf_counter()
+        try:
+            response = local.session.post(f"{base_url}{record['endpoint']}", json=record["payload"], timeout=timeout)
+            status = response.status_code
+        except requests.RequestException:
+            status = "error"
+        return status, (time.perf_counter() - sent) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, records))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([latency for _, latency in results]) if results else np.zeros(1)
+    return {
+        "requests": len(results),
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed > 0 else None,
+        "status_codes": dict(Counter(str(status) for status, _ in results)),
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies, 50)), 2),
+            "p95": round(float(np.percentile(latencies, 95)), 2),
+            "p99": round(float(np.percentile(latencies, 99)), 2),
+            "max": round(float(latencies.max()), 2)
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a prediction log against the Crop Recommendation API")
+    parser.add_argument("logs", nargs="+", help="Log files or glob patterns (.jsonl or .jsonl.gz)")
+    parser.add_argument("--url", default="http://localhost:8000", help="API base URL")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent clients")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed relative to the captured timing (0 = as fast as possible)")
+    parser.add_argument("--limit", type=int, default=None, help="Replay at most this many records")
+    args = parser.parse_args()
+
+    records = read_records(args.logs, args.limit)
+    if not records:
+        print("No records found.")
+        return
+    
+    print(f"Replaying {len(records)} requests against {args.url}...")
+    summary = replay(records, args.url, args.concurrency, args.speed)
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Shadow scoring of a candidate model against live prediction traffic
+"""
+import queue
+import threading
+import numpy as np
+
+class ShadowScorer:
+    """
+    Scores sampled requests with the model that did not serve them.
+
+    Work is handed to a single background thread through a bounded queue;
+    when the queue is full new work is dropped instead of waiting, so shadow
+    scoring never slows down or backs up the serving path.
+    """
+
+    def __init__(self, max_queue_size=1000):
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._worker = None
+        self.reset()
+
+    def reset(self):
+        """Clear the accumulated comparison statistics"""
+        with self._lock:
+            self._submitted = 0
+            self._dropped = 0
+            self._scored_rows = 0
+            self._agreements = 0
+            self._confidence_delta_sum = 0.0
+            self._errors = 0
+
+    def start(self):
+        """Start the background scoring thread if it is not running"""
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+            self._worker.start()
+
+    def submit(self, primary_model, candidate_model, input_data, served_probabilities, served_variant):
+        """
+        Queue a request for shadow scoring without blocking.
+
+        Args:
+            primary_model: Production model.
+            candidate_model: Model under trial.
+            input_data: Model input array that was served.
+            served_probabilities: Class probabilities returned to the client.
+            served_variant: "primary" or "candidate", whichever model served the request.
+
+        Returns:
+            bool: True if queued, False if dropped because the queue is full.
+        """
+        item = (primary_model, candidate_model, input_data, served_probabilities, served_variant)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+        with self._lock:
+            self._submitted += 1
+        return True
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                self._score(*item)
+            except Exception as e:
+                print(f"Shadow scoring error: {e}")
+                with self._lock:
+                    self._errors += 1
+            finally:
+                self._queue.task_done()
+
+    def _score(self, primary_model, candidate_model, input_data, served_probabilities, served_variant):
+        if served_variant == "candidate":
+            candidate_proba = served_probabilities
+            primary_proba = primary_model.predict_proba(input_data)
+        else:
+            primary_proba = served_probabilities
+            candidate_proba = candidate_model.predict_proba(input_data)
+
+        primary_pred = primary_model.classes_[np.argmax(primary_proba, axis=1)]
+        candidate_pred = candidate_model.classes_[np.argmax(candidate_proba, axis=1)]
+        confidence_delta = candidate_proba.max(axis=1) - primary_proba.max(axis=1)
+
+        with self._lock:
+            self._scored_rows += len(primary_pred)
+            self._agreements += int(np.sum(primary_pred == candidate_pred))
+            self._confidence_delta_sum += float(np.sum(confidence_delta))
+
+    def stats(self):
+        """Return agreement and confidence delta of the candidate versus the primary model"""
+        with self._lock:
+            scored = self._scored_rows
+            return {
+                "submitted_requests": self._submitted,
+                "dropped_requests": self._dropped,
+                "queue_depth": self._queue.qsize(),
+                "scored_rows": scored,
+                "agreement_rate": self._agreements / scored if scored else None,
+                "mean_confidence_delta": self._confidence_delta_sum / scored if scored else None,
+                "errors": self._errors
+            }
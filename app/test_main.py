@@ -174,5 +174,413 @@ def test_input_validation_ranges():
     response = client.post("/predict", json=data)
     assert response.status_code == 422
 
+def test_shadow_info():
+    """Test shadow scoring endpoint"""
+    response = client.get("/model/shadow")
+    assert response.status_code == 200
+    data = response.json()
+    assert "candidate_loaded" in data
+    assert "ab_candidate_weight" in data
+    assert "agreement_rate" in data["stats"]
+    assert "dropped_requests" in data["stats"]
+
+def test_candidate_with_other_feature_transform_refused(tmp_path, monkeypatch):
+    """Test that a candidate trained with a different feature transform version is not loaded"""
+    import pickle
+    from types import SimpleNamespace
+    import main
+
+    candidate_path = tmp_path / "candidate.pkl"
+    candidate_path.write_bytes(pickle.dumps(SimpleNamespace(feature_transform_version_="other")))
+    monkeypatch.setattr(main, "CANDIDATE_MODEL_PATH", str(candidate_path))
+    monkeypatch.setattr(main, "candidate_model", None)
+
+    with pytest.raises(ValueError):
+        main.load_candidate_model()
+    assert main.candidate_model is None
+
+def test_shadow_scorer_sheds_load():
+    """Test that shadow scoring drops work instead of queueing past its limit"""
+    import numpy as np
+    from shadow import ShadowScorer
+
+    scorer = ShadowScorer(max_queue_size=2)  # worker not started, so the queue fills up
+    probabilities = np.array([[0.9, 0.1]])
+    results = [scorer.submit(None, None, None, probabilities, "primary") for _ in range(5)]
+    assert results == [True, True, False, False, False]
+    stats = scorer.stats()
+    assert stats["submitted_requests"] == 2
+    assert stats["dropped_requests"] == 3
+    assert stats["queue_depth"] == 2
+
+def test_drift_report():
+    """Test drift monitoring endpoint"""
+    response = client.get("/monitoring/drift")
+    # Will return 503 if the reference sketch was not generated, which is okay in CI
+    assert response.status_code in [200, 503]
+    
+    if response.status_code == 200:
+        data = response.json()
+        assert "live_rows" in data
+        assert "psi" in data["features"]["N"]
+
+def test_feature_sketch_drift():
+    """Test that the streaming sketch is fixed-size and detects a shifted distribution"""
+    import numpy as np
+    from drift_sketch import FeatureSketch
+
+    rng = np.random.default_rng(0)
+    reference = FeatureSketch(["a", "b"], [0, 0], [100, 100], bins=20)
+    reference.update(rng.uniform(0, 50, size=(5000, 2)))
+    live = reference.empty_like()
+    live.update(np.column_stack([rng.uniform(0, 50, 5000), rng.uniform(50, 100, 5000)]))
+
+    assert live.counts.shape == (2, 20)
+    assert live.n_rows == 5000
+    scores = live.drift_scores(reference)
+    assert scores["a"]["psi"] < 0.1
+    assert scores["b"]["psi"] > 1.0
+    assert abs(reference.quantiles([0.5])[0, 0] - 25) < 2
+
+def test_prediction_logger_drops_and_flushes(tmp_path):
+    """Test that the prediction log drops records when full and writes buffered ones"""
+    import json
+    from prediction_log import PredictionLogger
+
+    log_path = tmp_path / "predictions.jsonl"
+    logger = PredictionLogger(str(log_path), buffer_size=3, flush_interval=60)
+    results = [logger.log({"ts": i, "endpoint": "/predict"}) for i in range(5)]
+    assert results == [True, True, True, False, False]
+    assert logger.stats()["dropped"] == 2
+
+    logger.start()
+    logger.close()
+    lines = log_path.read_text().splitlines()
+    assert [json.loads(line)["ts"] for line in lines] == [0, 1, 2]
+
+def test_feature_transform_batch():
+    """Test that the shared feature transform appends derived features to a batch"""
+    import numpy as np
+    import pandas as pd
+    from feature_transform import FeatureTransform
+
+    names = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+    transform = FeatureTransform(["npk_sum", "n_p_ratio"]).fit(pd.DataFrame(columns=names))
+    raw = np.array([[90, 42, 43, 20.87, 82.0, 6.5, 202.93],
+                    [10, 9, 5, 30.0, 50.0, 7.0, 100.0]])
+    output = transform.transform(raw)
+
+    assert output.dtype == np.float32
+    assert output.shape == (2, 9)
+    assert transform.output_names[-2:] == ["npk_sum", "n_p_ratio"]
+    np.testing.assert_allclose(output[:, 7], [175, 24])
+    np.testing.assert_allclose(output[:, 8], [90 / 43, 1.0], rtol=1e-6)
+
+def test_model_memory():
+    """Test worker memory endpoint"""
+    response = client.get("/model/memory")
+    assert response.status_code == 200
+    data = response.json()
+    assert "serving_mode" in data
+    assert data["process"]["pid"] > 0
+
+def test_flat_forest_matches_sklearn(tmp_path):
+    """Test that the memory-mapped flat forest reproduces RandomForestClassifier probabilities"""
+    import numpy as np
+    from sklearn.datasets import make_classification
+    from sklearn.ensemble import RandomForestClassifier
+    from flat_forest import FlatForest
+
+    X, y = make_classification(n_samples=300, n_features=7, n_informative=5, n_classes=4, random_state=0)
+    forest = RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0).fit(X, y)
+    FlatForest.from_model(forest).save(str(tmp_path))
+    flat = FlatForest.load(str(tmp_path))
+
+    assert isinstance(flat.value, np.memmap)
+    np.testing.assert_allclose(flat.predict_proba(X), forest.predict_proba(X), atol=1e-12)
+    np.testing.assert_array_equal(flat.predict(X), forest.predict(X))
+
+def test_early_exit_exact_at_full_confidence():
+    """Test that early exit with confidence 1.0 keeps the full forest's argmax and skips trees"""
+    import numpy as np
+    from sklearn.datasets import make_classification
+    from sklearn.ensemble import RandomForestClassifier
+    from flat_forest import FlatForest
+
+    X, y = make_classification(n_samples=400, n_features=7, n_informative=5, n_classes=4,
+                               class_sep=2.0, random_state=0)
+    forest = RandomForestClassifier(n_estimators=60, max_depth=8, random_state=0).fit(X, y)
+    flat = FlatForest.from_model(forest)
+
+    columns, proba, trees_used = flat.predict_early_exit(X, confidence=1.0, chunk_size=5)
+    np.testing.assert_array_equal(columns, np.argmax(forest.predict_proba(X), axis=1))
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+    assert trees_used.max() <= 60
+    assert trees_used.mean() < 60
+
+    _, _, relaxed = flat.predict_early_exit(X, confidence=0.95, chunk_size=5)
+    assert np.all(relaxed <= trees_used)
+
+def test_early_exit_info():
+    """Test early-exit statistics endpoint"""
+    response = client.get("/model/early-exit")
+    assert response.status_code == 200
+    assert "avg_trees_per_row" in response.json()
+
+def test_admission_controller_limits():
+    """Test that admission rejects oversized batches, queues up to the limit and times out"""
+    import asyncio
+    from admission import AdmissionController, AdmissionRejected
+
+    async def scenario():
+        controller = AdmissionController(max_batch_rows=100, max_inflight_rows=10, max_queue_size=1,
+                                         max_wait_seconds=0.05, chunk_rows=10)
+        with pytest.raises(AdmissionRejected) as too_large:
+            await controller.acquire(101)
+        assert too_large.value.status_code == 413
+
+        held = await controller.acquire(50)  # a batch reserves one chunk
+        assert held == 10
+        waiter = asyncio.ensure_future(controller.acquire(1))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as queue_full:
+            await controller.acquire(1)
+        assert queue_full.value.status_code == 429
+        assert queue_full.value.retry_after >= 1
+
+        controller.release(held)
+        assert await waiter == 1
+        controller.release(1)
+
+        await controller.acquire(10)
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await controller.acquire(1)
+        assert timed_out.value.reason == "queue_timeout"
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["rejected_requests"] == {"batch_too_large": 1, "queue_full": 1, "queue_timeout": 1}
+    assert stats["inflight_rows"] == 10
+    assert stats["queue_depth"] == 0
+
+def test_oversized_batch_rejected_before_validation():
+    """Test that batches over the row limit get 413 from the raw body, before any row is validated"""
+    from main import admission
+
+    too_many = admission.max_batch_rows + 1
+    response = client.post("/predict/batch", json=[{"N": "not validated"}] * too_many)
+    assert response.status_code == 413
+    assert str(too_many) in response.json()["detail"]
+
+    response = client.post("/predict/batch", content=b" " * (admission.max_batch_rows * admission.max_row_bytes + 1),
+                           headers={"Content-Type": "application/json"})
+    assert response.status_code == 413
+
+def test_admission_info():
+    """Test admission statistics endpoint"""
+    response = client.get("/monitoring/admission")
+    assert response.status_code == 200
+    assert "queue_depth" in response.json()
+
+def test_streaming_evaluation_matches_sklearn():
+    """Test that chunk-accumulated confusion matrix and report match sklearn on the full arrays"""
+    import numpy as np
+    from sklearn.metrics import classification_report, confusion_matrix
+    from model_evaluation import accumulate_confusion, trim_confusion, classification_report_from_confusion
+
+    rng = np.random.default_rng(0)
+    y_true = rng.integers(0, 6, 500)
+    y_pred = np.where(rng.random(500) < 0.7, y_true, rng.integers(0, 7, 500))
+    classes = np.arange(8)
+    cm = np.zeros((8, 8), dtype=np.int64)
+    for start in range(0, 500, 64):
+        accumulate_confusion(cm, classes, y_true[start:start + 64], y_pred[start:start + 64])
+    cm, labels = trim_confusion(cm, classes)
+
+    np.testing.assert_array_equal(cm, confusion_matrix(y_true, y_pred))
+    assert classification_report_from_confusion(cm, labels) == \
+        classification_report(y_true, y_pred, zero_division=0)
+
+def test_cross_validation_switch():
+    """Test that evaluation.cv_folds: 0 skips cross-validation without reading the dataset"""
+    from model_evaluation import cross_validate
+
+    assert cross_validate(None, {"evaluation": {"cv_folds": 0}}) == (None, None)
+
+def test_synthetic_data_schema():
+    """Test that synthetic data matches the source CSV schema with balanced labels"""
+    from synthetic_data import generate, CLASS_PROFILES, FEATURE_RANGES
+
+    df = generate(440, random_state=0)
+    assert list(df.columns) == ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall', 'label']
+    assert len(CLASS_PROFILES) == 22
+    assert (df['label'].value_counts() == 20).all()
+    for name, (low, high) in FEATURE_RANGES.items():
+        assert df[name].between(low, high).all()
+
+def test_encoded_target_keeps_declared_dtype():
+    """Test that the schema keeps an encoded label at encoded_target_dtype, also after a concat"""
+    import pandas as pd
+    from schema import apply_schema, cast_encoded_target
+
+    params = {"schema": {"dtypes": {"N": "float32", "label": "category"}, "encoded_target_dtype": "uint8"},
+              "preprocessing": {"target_column": "label"}}
+    raw = apply_schema(pd.DataFrame({"N": [1.0, 2.0], "label": ["rice", "maize"]}), params)
+    assert str(raw["label"].dtype) == "category"
+
+    encoded = apply_schema(pd.DataFrame({"N": [1.0, 2.0], "label": [3, 5]}), params, encoded_target=True)
+    assert str(encoded["label"].dtype) == "uint8"
+    combined = pd.concat([encoded["label"], pd.Series([7], dtype="int64")])
+    assert str(cast_encoded_target(combined, params).dtype) == "uint8"
+
+def test_incremental_read_new_rows_offsets(tmp_path):
+    """Test that only complete rows after the recorded offset are read, and the offset advances past them"""
+    import json
+    from incremental_training import read_new_rows
+
+    source = tmp_path / "crops.csv"
+    state_file = tmp_path / "ingest_state.json"
+    header = b"N,P,K,temperature,humidity,ph,rainfall,label\n"
+    old_rows = b"90,42,43,20.8,82.0,6.5,202.9,rice\n85,58,41,21.7,80.3,7.0,226.6,rice\n"
+    source.write_bytes(header + old_rows)
+    offset = len(header + old_rows)
+    state_file.write_text(json.dumps({"source": str(source), "offset": offset, "rows": 2}))
+    params = {"data": {"source": str(source)}, "incremental": {"state_file": str(state_file)},
+              "schema": {"dtypes": {"N": "float32", "label": "category"}}}
+
+    assert read_new_rows(params) == (None, offset)
+
+    new_row = b"71,54,16,22.6,63.6,5.7,87.7,maize\n"
+    with open(source, "ab") as f:
+        f.write(new_row + b"61,44,17,26.1,71.5")  # second row still being written
+    df, new_offset = read_new_rows(params)
+    assert len(df) == 1 and df["label"].iloc[0] == "maize"
+    assert str(df["N"].dtype) == "float32"
+    assert new_offset == offset + len(new_row)
+
+    with open(source, "ab") as f:
+        f.write(b",6.9,102.2,maize\n")
+    state_file.write_text(json.dumps({"source": str(source), "offset": new_offset, "rows": 3}))
+    df, final_offset = read_new_rows(params)
+    assert len(df) == 1 and df["N"].iloc[0] == 61
+    assert final_offset == source.stat().st_size
+
+def test_incremental_source_without_trailing_newline(tmp_path):
+    """Test that a last row ingested without a line break is neither re-read nor glued to appended rows"""
+    import json
+    from data_ingestion import last_line_offset
+    from incremental_training import read_new_rows
+
+    source = tmp_path / "crops.csv"
+    state_file = tmp_path / "ingest_state.json"
+    source.write_bytes(b"N,label\n90,rice\n85,rice")
+    offset, tail = last_line_offset(str(source), block_size=4)
+    assert (offset, tail) == (len(b"N,label\n90,rice\n"), "85,rice")
+    state_file.write_text(json.dumps({"source": str(source), "offset": offset, "tail": tail, "rows": 2}))
+    params = {"data": {"source": str(source)}, "incremental": {"state_file": str(state_file)},
+              "schema": {"dtypes": {"N": "float32", "label": "category"}}}
+
+    assert read_new_rows(params) == (None, offset)
+    with open(source, "ab") as f:
+        f.write(b"\n71,maize\n")
+    df, new_offset = read_new_rows(params)
+    assert df["label"].tolist() == ["maize"] and new_offset == source.stat().st_size
+
+    source.write_bytes(b"N,label\n90,rice\n85,rice71,maize\n")
+    with pytest.raises(ValueError):
+        read_new_rows(params)
+
+def test_incremental_add_trees_cap_and_seeds():
+    """Test that capped incremental runs drop the oldest trees and grow new trees with fresh seeds"""
+    from sklearn.datasets import make_classification
+    from sklearn.ensemble import RandomForestClassifier
+    from incremental_training import add_trees
+
+    X, y = make_classification(n_samples=200, n_features=7, n_informative=5, n_classes=3, random_state=0)
+    model = RandomForestClassifier(n_estimators=10, max_depth=5, random_state=42).fit(X, y)
+    params = {"incremental": {"n_new_estimators": 10, "max_total_estimators": 15}}
+
+    first = add_trees(model, X, y, params)
+    first_new = first.estimators_[5:]
+    assert len(first.estimators_) == 15
+    second = add_trees(first, X, y, params)
+    assert len(second.estimators_) == 15
+    assert second.estimators_[:5] == first_new[5:]  # oldest trees were dropped
+
+    seeds = [tree.random_state for tree in second.estimators_]
+    assert len(set(seeds)) == len(seeds)
+    assert second.random_state == 42 and second.incremental_runs_ == 2
+
+def test_pruning_selection_independent_of_block_size():
+    """Test that blockwise candidate scoring selects the same trees as scoring all candidates at once"""
+    import numpy as np
+    from sklearn.datasets import make_classification
+    from sklearn.ensemble import RandomForestClassifier
+    from flat_forest import FlatForest
+    from model_pruning import forest_proba, select_trees, top3_sets
+
+    X, y = make_classification(n_samples=300, n_features=7, n_informative=5, n_classes=4, random_state=0)
+    forest = FlatForest.from_model(RandomForestClassifier(n_estimators=20, max_depth=6, random_state=0).fit(X, y))
+    leaves = forest.apply(X).astype(np.int32)
+    full_top3 = top3_sets(forest_proba(leaves, forest.value))
+
+    args = (leaves, forest.value, y, full_top3, 0.0, 1.0, 5)
+    assert select_trees(*args, max_block=1) == select_trees(*args)
+
+def test_pruning_top3_ignores_single_tree_votes():
+    """Test that top-3 agreement only compares classes with more than one tree's worth of votes"""
+    import numpy as np
+    from model_pruning import top3_agreement, top3_sets
+
+    full = np.array([[2.6, 0.0, 0.4, 0.0], [1.5, 1.2, 1.3, 0.0]])
+    full_top3 = top3_sets(full)
+    assert full_top3.tolist() == [[-1, -1, 0], [0, 1, 2]]
+    in_top3 = np.zeros(full.shape, dtype=bool)
+    rows, slots = np.nonzero(full_top3 >= 0)
+    in_top3[rows, full_top3[rows, slots]] = True
+
+    subsets = np.array([
+        [[1.6, 0.0, 0.0, 0.4], [2.0, 0.9, 1.9, 0.2]],  # noise class swapped: agrees; weak class 1 drops out
+        [[1.2, 0.0, 0.0, 1.8], [1.1, 1.6, 1.3, 1.6]]   # another class gains real votes / ties
+    ])
+    assert top3_agreement(subsets, in_top3, in_top3.sum(axis=1)).tolist() == [[True, False], [False, False]]
+
+def test_select_model_from_dvc3_exp_show():
+    """Test the Pareto front and tolerance-based selection on `dvc exp show --json` output of DVC 3"""
+    from select_model import collect_runs, select_model
+
+    def rev(rev, name, accuracy, latency, n_estimators):
+        metrics = {"metrics/metrics.json": {"data": {"accuracy": accuracy}}}
+        if latency is not None:
+            metrics["metrics/serving_cost.json"] = {"data": {"single_row_latency_ms": latency}}
+        return {"rev": rev, "name": name, "error": None, "experiments": None,
+                "data": {"rev": rev, "timestamp": None, "deps": {}, "outs": {}, "metrics": metrics,
+                         "params": {"params.yaml": {"data": {"model": {"n_estimators": n_estimators}}}}}}
+
+    def experiment(name, *args):
+        return {"name": name, "executor": None, "revs": [rev("e" * 40, name, *args)]}
+
+    baseline = rev("a" * 40, "main", 0.990, 5.5, 200)
+    baseline["experiments"] = [
+        experiment("exp-small", 0.986, 1.0, 20),
+        experiment("exp-mid", 0.988, 2.5, 50),
+        experiment("exp-slow", 0.985, 3.0, 60),
+        experiment("exp-deep", 0.992, 8.0, 400),
+        experiment("exp-no-cost", 0.999, None, 10),
+        {"name": "exp-failed", "executor": None,
+         "revs": [{"rev": "f" * 40, "name": "exp-failed", "data": None, "error": {"msg": "failed"}}]}
+    ]
+    exp_show = [rev("workspace", None, 0.990, 5.0, 200), baseline]
+
+    runs = collect_runs(exp_show)
+    assert sorted(run["name"] for run in runs) == sorted(
+        ["workspace", "main", "exp-small", "exp-mid", "exp-slow", "exp-deep", "exp-no-cost"])
+    assert next(run for run in runs if run["name"] == "exp-mid")["params"]["model.n_estimators"] == 50
+
+    selected, best, front = select_model(runs, "accuracy", "single_row_latency_ms", tolerance=0.005)
+    assert [run["name"] for run in front] == ["exp-small", "exp-mid", "workspace", "exp-deep"]
+    assert best["name"] == "exp-deep" and selected["name"] == "exp-mid"
+    assert select_model(runs, "accuracy", "single_row_latency_ms", tolerance=0.01)[0]["name"] == "exp-small"
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -13,7 +13,8 @@ dvc exp run --name "exp-baseline" \
     -S model.n_estimators=100 \
     -S model.max_depth=10 \
     -S model.min_samples_split=2 \
-    -S model.min_samples_leaf=1
+    -S model.min_samples_leaf=1 \
+    -S evaluation.mode=metrics_only
 
 # Experiment 2: More trees
 echo ""
@@ -22,7 +23,8 @@ dvc exp run --name "exp-trees-200" \
     -S model.n_estimators=200 \
     -S model.max_depth=10 \
     -S model.min_samples_split=2 \
-    -S model.min_samples_leaf=1
+    -S model.min_samples_leaf=1 \
+    -S evaluation.mode=metrics_only
 
 # Experiment 3: Even more trees
 echo ""
@@ -31,7 +33,8 @@ dvc exp run --name "exp-trees-300" \
     -S model.n_estimators=300 \
     -S model.max_depth=10 \
     -S model.min_samples_split=2 \
-    -S model.min_samples_leaf=1
+    -S model.min_samples_leaf=1 \
+    -S evaluation.mode=metrics_only
 
 # Experiment 4: Deeper trees
 echo ""
@@ -40,7 +43,8 @@ dvc exp run --name "exp-depth-20" \
     -S model.n_estimators=100 \
     -S model.max_depth=20 \
     -S model.min_samples_split=2 \
-    -S model.min_samples_leaf=1
+    -S model.min_samples_leaf=1 \
+    -S evaluation.mode=metrics_only
 
 # Experiment 5: Very deep trees
 echo ""
@@ -49,7 +53,8 @@ dvc exp run --name "exp-depth-30" \
     -S model.n_estimators=100 \
     -S model.max_depth=30 \
     -S model.min_samples_split=2 \
-    -S model.min_samples_leaf=1
+    -S model.min_samples_leaf=1 \
+    -S evaluation.mode=metrics_only
 
 # Experiment 6: Regularization with min_samples_split
 echo ""
@@ -58,7 +63,8 @@ dvc exp run --name "exp-split-5" \
     -S model.n_estimators=100 \
     -S model.max_depth=10 \
     -S model.min_samples_split=5 \
-    -S model.min_samples_leaf=1
+    -S model.min_samples_leaf=1 \
+    -S evaluation.mode=metrics_only
 
 # Experiment 7: More regularization with min_samples_split
 echo ""
@@ -67,7 +73,8 @@ dvc exp run --name "exp-split-10" \
     -S model.n_estimators=100 \
     -S model.max_depth=10 \
     -S model.min_samples_split=10 \
-    -S model.min_samples_leaf=1
+    -S model.min_samples_leaf=1 \
+    -S evaluation.mode=metrics_only
 
 # Experiment 8: Regularization with min_samples_leaf
 echo ""
@@ -76,7 +83,8 @@ dvc exp run --name "exp-leaf-2" \
     -S model.n_estimators=100 \
     -S model.max_depth=10 \
     -S model.min_samples_split=2 \
-    -S model.min_samples_leaf=2
+    -S model.min_samples_leaf=2 \
+    -S evaluation.mode=metrics_only
 
 # Experiment 9: More regularization with min_samples_leaf
 echo ""
@@ -85,7 +93,8 @@ dvc exp run --name "exp-leaf-4" \
     -S model.n_estimators=100 \
     -S model.max_depth=10 \
     -S model.min_samples_split=2 \
-    -S model.min_samples_leaf=4
+    -S model.min_samples_leaf=4 \
+    -S evaluation.mode=metrics_only
 
 # Experiment 10: Balanced configuration
 echo ""
@@ -94,7 +103,8 @@ dvc exp run --name "exp-balanced" \
     -S model.n_estimators=200 \
     -S model.max_depth=15 \
     -S model.min_samples_split=5 \
-    -S model.min_samples_leaf=2
+    -S model.min_samples_leaf=2 \
+    -S evaluation.mode=metrics_only
 
 # Experiment 11: High capacity model
 echo ""
@@ -103,7 +113,8 @@ dvc exp run --name "exp-high-capacity" \
     -S model.n_estimators=300 \
     -S model.max_depth=25 \
     -S model.min_samples_split=2 \
-    -S model.min_samples_leaf=1
+    -S model.min_samples_leaf=1 \
+    -S evaluation.mode=metrics_only
 
 # Experiment 12: Regularized model
 echo ""
@@ -112,7 +123,8 @@ dvc exp run --name "exp-regularized" \
     -S model.n_estimators=150 \
     -S model.max_depth=8 \
     -S model.min_samples_split=10 \
-    -S model.min_samples_leaf=4
+    -S model.min_samples_leaf=4 \
+    -S evaluation.mode=metrics_only
 
 echo ""
 echo "=========================================================="
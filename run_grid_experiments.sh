@@ -25,7 +25,8 @@ for n_est in "${n_estimators[@]}"; do
                 -S model.n_estimators=${n_est} \
                 -S model.max_depth=${depth} \
                 -S model.min_samples_split=${split} \
-                -S model.min_samples_leaf=1
+                -S model.min_samples_leaf=1 \
+                -S evaluation.mode=metrics_only
             
             exp_num=$((exp_num + 1))
             
@@ -0,0 +1,176 @@
+"""
+Benchmarks how the pipeline stages scale with the number of rows
+
+For each row count a synthetic dataset (see src/synthetic_data.py) is written
+to a scratch directory together with a copy of params.yaml, and every stage
+of run_pipeline.py is run there in its own subprocess. Wall time and peak
+resident memory of each stage process are collected into a table (CSV) and a
+log-log plot.
+Nothing is downloaded and the repository's data, models and metrics are not
+touched.
+
+Usage:
+    python src/benchmark_pipeline.py --rows 10000 100000 1000000 10000000
+    python src/benchmark_pipeline.py --rows 10000 100000 --set model.n_estimators=50 --no-plot
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import pandas as pd
+import yaml
+from run_pipeline import STAGES
+from synthetic_data import write_csv
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def load_params():
+    """Load parameters from params.yaml"""
+    with open("params.yaml", "r") as f:
+        params = yaml.safe_load(f)
+    return params
+
+def set_param(params, dotted_key, value):
+    """Override a nested parameter given as section.key=value (value parsed as YAML)"""
+    *sections, key = dotted_key.split(".")
+    target = params
+    for section in sections:
+        target = target[section]
+    target[key] = yaml.safe_load(value)
+
+def run_stage(script, workdir, log_file):
+    """
+    Runs a pipeline stage in a subprocess.
+
+    Returns:
+        tuple: Exit code, wall time in seconds and peak RSS of the stage process
+            in MB (None where the platform does not report it).
+    """
+    started = time.perf_counter()
+    with open(log_file, "w") as log:
+        process = subprocess.Popen([sys.executable, os.path.join(SRC_DIR, script)],
+                                   cwd=workdir, stdout=log, stderr=subprocess.STDOUT)
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            peak_mb = usage.ru_maxrss / 1024  # ru_maxrss is in KB on Linux
+            if sys.platform == "darwin":
+                peak_mb /= 1024  # and in bytes on macOS
+        else:
+            process.wait()
+            peak_mb = None
+    return process.returncode, time.perf_counter() - started, peak_mb
+
+def prepare_workdir(workdir, params):
+    """Create the directory layout the stages expect and write their params.yaml"""
+    for directory in ["data", "models", "metrics", "plots"]:
+        os.makedirs(os.path.join(workdir, directory), exist_ok=True)
+    with open(os.path.join(workdir, "params.yaml"), "w") as f:
+        yaml.safe_dump(params, f, sort_keys=False)
+
+def benchmark(row_counts, params, workdir, random_state=42, keep=False):
+    """
+    Runs every stage at every row count.
+
+    Stops at the first failing stage (typically running out of memory at the
+    largest size) and returns the results collected so far. Each size's
+    directory is removed once it passes unless keep is set.
+
+    Returns:
+        pd.DataFrame: One row per (rows, stage) with time and peak memory.
+    """
+    results = []
+    for n_rows in row_counts:
+        run_dir = os.path.join(workdir, f"rows_{n_rows}")
+        prepare_workdir(run_dir, params)
+
+        started = time.perf_counter()
+        source = os.path.join(run_dir, params["data"]["source"])
+        write_csv(n_rows, source, random_state=random_state)
+        print(f"[{n_rows} rows] synthetic data: {time.perf_counter() - started:.1f}s, "
+              f"{os.path.getsize(source) / (1024 ** 2):.1f} MB")
+
+        for stage, script in STAGES:
+            log_file = os.path.join(run_dir, f"{os.path.splitext(script)[0]}.log")
+            returncode, seconds, peak_mb = run_stage(script, run_dir, log_file)
+            results.append({"rows": n_rows, "stage": stage, "seconds": round(seconds, 3),
+                            "peak_rss_mb": round(peak_mb, 1) if peak_mb is not None else None,
+                            "status": "ok" if returncode == 0 else f"exit {returncode}"})
+            print(f"[{n_rows} rows] {stage}: {seconds:.2f}s, peak RSS "
+                  f"{'n/a' if peak_mb is None else f'{peak_mb:.1f} MB'}")
+            if returncode != 0:
+                with open(log_file, "r") as f:
+                    print(f"{stage} failed, last output:\n{''.join(f.readlines()[-20:])}")
+                return pd.DataFrame(results)
+
+        if not keep:
+            # Free the disk space of this size before generating the next one
+            shutil.rmtree(run_dir, ignore_errors=True)
+    return pd.DataFrame(results)
+
+def plot_results(results, output_file):
+    """Log-log plot of time and peak memory per stage against row count"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(1, 2, figsize=(14, 5))
+    for stage, group in results.groupby("stage", sort=False):
+        axes[0].plot(group["rows"], group["seconds"], marker="o", label=stage)
+        axes[1].plot(group["rows"], group["peak_rss_mb"], marker="o", label=stage)
+    for ax, ylabel in zip(axes, ["Wall time (s)", "Peak RSS (MB)"]):
+        ax.set_xscale("log")
+        ax.set_yscale("log")
+        ax.set_xlabel("Rows")
+        ax.set_ylabel(ylabel)
+        ax.grid(True, which="both", alpha=0.3)
+    axes[0].legend()
+    fig.suptitle("Pipeline scaling")
+    fig.tight_layout()
+    fig.savefig(output_file, dpi=150)
+    plt.close(fig)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic data of increasing size")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Row counts to benchmark")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Override a params.yaml entry, e.g. model.n_estimators=50 (repeatable)")
+    parser.add_argument("--workdir", help="Scratch directory kept for inspection (a temporary one is used by default)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the synthetic data")
+    parser.add_argument("--output", default="metrics/benchmark.csv", help="CSV file for the results table")
+    parser.add_argument("--plot", default="plots/benchmark.png", help="Image file for the scaling plot")
+    parser.add_argument("--no-plot", action="store_true", help="Skip the plot")
+    args = parser.parse_args()
+
+    params = load_params()
+    # Plots are not part of what is being measured
+    params["evaluation"]["mode"] = "metrics_only"
+    for override in args.set:
+        key, _, value = override.partition("=")
+        set_param(params, key, value)
+
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+        results = benchmark(args.rows, params, args.workdir, random_state=args.seed, keep=True)
+    else:
+        with tempfile.TemporaryDirectory(prefix="pipeline-benchmark-") as workdir:
+            results = benchmark(args.rows, params, workdir, random_state=args.seed)
+
+    print("\nPipeline scaling benchmark:")
+    print(results.to_string(index=False))
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    results.to_csv(args.output, index=False)
+    print(f"\nResults written to {args.output}")
+
+    if not args.no_plot and not results.empty:
+        os.makedirs(os.path.dirname(args.plot) or ".", exist_ok=True)
+        plot_results(results, args.plot)
+        print(f"Plot written to {args.plot}")
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ import pandas as pd
 import yaml
 import pickle
 import os
+import json
+from schema import get_column_dtypes, memory_usage_mb, file_size_mb
 
 def load_params():
     """Load parameters from params.yaml"""
@@ -9,6 +11,30 @@ def load_params():
         params = yaml.safe_load(f)
     return params
 
+def last_line_offset(file_path, block_size=65536):
+    """
+    Finds where the last complete line of a file ends.
+
+    Returns:
+        tuple: Byte offset just past the last line break, and the text of an
+        unterminated last row after it ("" when the file ends with a line break).
+    """
+    with open(file_path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        offset = 0
+        pos = end
+        while pos > 0:
+            start = max(0, pos - block_size)
+            f.seek(start)
+            newline = f.read(pos - start).rfind(b"\n")
+            if newline >= 0:
+                offset = start + newline + 1
+                break
+            pos = start
+        f.seek(offset)
+        tail = f.read()
+    return offset, tail.decode()
+
 def load_data():
     """
     Loads the dataset from a given CSV file path.
@@ -20,14 +46,26 @@ def load_data():
     file_path = params["data"]["source"]
     
     try:
-        df = pd.read_csv(file_path)
+        offset, tail = last_line_offset(file_path)
+        
+        # Apply the declared dtypes at read time so wide defaults are never materialized
+        df = pd.read_csv(file_path, dtype=get_column_dtypes(params))
         print(f"Data loaded successfully. Shape: {df.shape}")
+        print(f"[data_ingestion] Memory footprint: source={file_size_mb(file_path):.3f} MB on disk, "
+              f"loaded={memory_usage_mb(df):.3f} MB")
+        print(f"Column dtypes: {df.dtypes.astype(str).to_dict()}")
         
         # Save raw data for next stage
         os.makedirs("data", exist_ok=True)
         with open("data/raw_data.pkl", "wb") as f:
             pickle.dump(df, f)
         
+        # Record how much of the source has been ingested for incremental retraining.
+        # The offset stops at the last line break; a last row without one is kept
+        # as the tail so rows appended later are not read as part of it.
+        with open(params["incremental"]["state_file"], "w") as f:
+            json.dump({"source": file_path, "offset": offset, "tail": tail, "rows": len(df)}, f, indent=2)
+        
         return df
     except Exception as e:
         print(f"Error loading data: {e}")
@@ -3,6 +3,7 @@ import yaml
 import pickle
 import os
 from sklearn.preprocessing import LabelEncoder
+from schema import apply_schema, memory_usage_mb, log_memory
 
 def load_params():
     """Load parameters from params.yaml"""
@@ -26,6 +27,7 @@ def preprocess_data():
     # Load raw data
     with open("data/raw_data.pkl", "rb") as f:
         df = pickle.load(f)
+    memory_before = memory_usage_mb(df)
     
     # Drop duplicates if configured
     if params["preprocessing"]["drop_duplicates"]:
@@ -37,11 +39,22 @@ def preprocess_data():
 
     # Encode target column
     target_col = params["preprocessing"]["target_column"]
-    if target_col in df.columns and params["preprocessing"]["encode_categorical"]:
+    encoded = target_col in df.columns and params["preprocessing"]["encode_categorical"]
+    if encoded:
         le = LabelEncoder()
-        df[target_col] = le.fit_transform(df[target_col])
+        encoded_dtype = params["schema"]["encoded_target_dtype"]
+        df[target_col] = le.fit_transform(df[target_col]).astype(encoded_dtype)
+        
+        # Keep the fitted encoder so later increments are encoded consistently
+        with open(params["preprocessing"]["label_encoder_file"], "wb") as f:
+            pickle.dump(le, f)
+
+    # Re-apply the declared dtypes in case imputation widened any column;
+    # an encoded label keeps schema.encoded_target_dtype
+    df = apply_schema(df, params, encoded_target=encoded)
 
     print("Data preprocessing completed.")
+    log_memory("data_preprocessing", memory_before, memory_usage_mb(df))
     
     # Save processed data
     with open("data/processed_data.pkl", "wb") as f:
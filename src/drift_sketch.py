@@ -0,0 +1,119 @@
+import json
+import numpy as np
+
+class FeatureSketch:
+    """
+    Fixed-memory histogram sketch over a set of numeric features.
+
+    Every feature gets the same number of equal-width bins over a fixed range;
+    values outside the range are counted in the first or last bin. Memory is
+    O(features x bins) regardless of how many rows are added, and an update is
+    a single vectorized bincount over the whole batch.
+    """
+
+    def __init__(self, feature_names, lower, upper, bins):
+        self.feature_names = list(feature_names)
+        self.lower = np.asarray(lower, dtype=np.float64)
+        self.upper = np.asarray(upper, dtype=np.float64)
+        self.bins = int(bins)
+        self.counts = np.zeros((len(self.feature_names), self.bins), dtype=np.int64)
+        self._width = (self.upper - self.lower) / self.bins
+        self._offsets = np.arange(len(self.feature_names)) * self.bins
+
+    @classmethod
+    def from_params(cls, params):
+        """Create an empty sketch from the drift section of params.yaml"""
+        ranges = params["drift"]["feature_ranges"]
+        names = list(ranges)
+        return cls(names, [ranges[n][0] for n in names], [ranges[n][1] for n in names],
+                   params["drift"]["bins"])
+
+    def empty_like(self):
+        """Return an empty sketch with the same features and bins"""
+        return FeatureSketch(self.feature_names, self.lower, self.upper, self.bins)
+
+    @property
+    def n_rows(self):
+        return int(self.counts[0].sum()) if len(self.feature_names) else 0
+
+    def update(self, X):
+        """
+        Adds a batch of rows to the sketch.
+
+        Args:
+            X (array-like): 2D array with one column per feature, in feature_names order.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        if X.shape[0] == 0:
+            return
+        idx = np.floor((X - self.lower) / self._width)
+        idx = np.clip(np.nan_to_num(idx, nan=0), 0, self.bins - 1).astype(np.int64)
+        flat = (idx + self._offsets).ravel()
+        self.counts += np.bincount(flat, minlength=self.counts.size).reshape(self.counts.shape)
+
+    def reset(self):
+        """Clear all counts"""
+        self.counts[:] = 0
+
+    def quantiles(self, qs):
+        """
+        Estimates quantiles per feature by interpolating within histogram bins.
+
+        Returns:
+            np.ndarray: Array of shape (features, len(qs)); NaN for an empty sketch.
+        """
+        qs = np.asarray(qs, dtype=np.float64)
+        result = np.full((len(self.feature_names), len(qs)), np.nan)
+        for j in range(len(self.feature_names)):
+            total = self.counts[j].sum()
+            if total == 0:
+                continue
+            cdf = np.concatenate([[0.0], np.cumsum(self.counts[j]) / total])
+            edges = self.lower[j] + self._width[j] * np.arange(self.bins + 1)
+            result[j] = np.interp(qs, cdf, edges)
+        return result
+
+    def drift_scores(self, reference, epsilon=1e-4):
+        """
+        Compares this sketch against a reference sketch with the same bins.
+
+        Returns:
+            dict: Per feature population stability index (psi) and the maximum
+            CDF difference between the two histograms (ks).
+        """
+        live = self.counts / np.maximum(self.counts.sum(axis=1, keepdims=True), 1)
+        ref = reference.counts / np.maximum(reference.counts.sum(axis=1, keepdims=True), 1)
+        live_smoothed = np.maximum(live, epsilon)
+        ref_smoothed = np.maximum(ref, epsilon)
+        psi = np.sum((live_smoothed - ref_smoothed) * np.log(live_smoothed / ref_smoothed), axis=1)
+        ks = np.max(np.abs(np.cumsum(live, axis=1) - np.cumsum(ref, axis=1)), axis=1)
+        return {
+            name: {"psi": float(psi[j]), "ks": float(ks[j])}
+            for j, name in enumerate(self.feature_names)
+        }
+
+    def to_dict(self):
+        return {
+            "feature_names": self.feature_names,
+            "lower": self.lower.tolist(),
+            "upper": self.upper.tolist(),
+            "bins": self.bins,
+            "counts": self.counts.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["feature_names"], data["lower"], data["upper"], data["bins"])
+        sketch.counts = np.asarray(data["counts"], dtype=np.int64)
+        return sketch
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as f:
+            return cls.from_dict(json.load(f))
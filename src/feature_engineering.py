@@ -1,6 +1,10 @@
 import pandas as pd
 import yaml
 import pickle
+import os
+from schema import memory_usage_mb, log_memory
+from drift_sketch import FeatureSketch
+from feature_transform import FeatureTransform
 
 def load_params():
     """Load parameters from params.yaml"""
@@ -12,6 +16,9 @@ def split_features_and_target():
     """
     Splits dataset into input features (X) and target variable (y).
 
+    Features are built by the shared FeatureTransform, which is saved so the
+    API applies exactly the same transform at serving time.
+
     Returns:
         tuple: X (features), y (target)
     """
@@ -22,10 +29,13 @@ def split_features_and_target():
     with open("data/processed_data.pkl", "rb") as f:
         df = pickle.load(f)
     
-    X = df.drop(columns=[target_col])
+    raw_features = df.drop(columns=[target_col])
+    transform = FeatureTransform(params["features"]["derived"]).fit(raw_features)
+    X = transform.transform_frame(raw_features)
     y = df[target_col]
 
     print("Feature and target split completed.")
+    log_memory("feature_engineering", memory_usage_mb(df), memory_usage_mb(X) + memory_usage_mb(y))
     
     # Save features and target
     with open("data/features.pkl", "wb") as f:
@@ -34,6 +44,20 @@ def split_features_and_target():
     with open("data/target.pkl", "wb") as f:
         pickle.dump(y, f)
     
+    transform_path = params["features"]["transform_file"]
+    os.makedirs(os.path.dirname(transform_path), exist_ok=True)
+    with open(transform_path, "wb") as f:
+        pickle.dump(transform, f)
+    print(f"Feature transform {transform.version} saved with features: {transform.output_names}")
+    
+    # Reference sketch of the training distribution for online drift monitoring
+    reference = FeatureSketch.from_params(params)
+    reference.update(X[reference.feature_names].to_numpy())
+    reference_path = params["drift"]["reference_sketch"]
+    os.makedirs(os.path.dirname(reference_path), exist_ok=True)
+    reference.save(reference_path)
+    print(f"Reference feature sketch saved to {reference_path}")
+    
     return X, y
 
 if __name__ == "__main__":
@@ -0,0 +1,81 @@
+import hashlib
+import numpy as np
+
+# Bump when the meaning of an existing derived feature changes
+TRANSFORM_VERSION = 1
+
+def _ratio(a, b):
+    return a / (b + 1.0)
+
+# Derived features available to params.yaml features.derived, computed on whole batches
+DERIVED_FEATURES = {
+    "n_p_ratio": lambda cols: _ratio(cols["N"], cols["P"]),
+    "n_k_ratio": lambda cols: _ratio(cols["N"], cols["K"]),
+    "p_k_ratio": lambda cols: _ratio(cols["P"], cols["K"]),
+    "npk_sum": lambda cols: cols["N"] + cols["P"] + cols["K"],
+    "temperature_humidity": lambda cols: cols["temperature"] * cols["humidity"] / 100.0,
+    "rainfall_humidity": lambda cols: cols["rainfall"] * cols["humidity"] / 100.0,
+}
+
+class FeatureTransform:
+    """
+    Turns raw model inputs into the model's feature matrix.
+
+    Used by both the training pipeline and the API so derived features are
+    defined once. transform() works on 2D NumPy batches: each derived feature
+    is one vectorized expression over a column, so the per-request cost does not
+    grow with per-row Python work.
+    """
+
+    def __init__(self, derived_features=()):
+        unknown = set(derived_features) - set(DERIVED_FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown derived features: {sorted(unknown)}")
+        self.derived_features = list(derived_features)
+        self.input_names = None
+
+    def fit(self, X):
+        """
+        Records the raw input columns and their order.
+
+        Args:
+            X (pd.DataFrame): Raw feature columns.
+
+        Returns:
+            FeatureTransform: self
+        """
+        self.input_names = list(X.columns)
+        return self
+
+    @property
+    def output_names(self):
+        return self.input_names + self.derived_features
+
+    @property
+    def version(self):
+        """Identifier of the transform definition, stored with the model it was trained with"""
+        definition = f"{TRANSFORM_VERSION}|{','.join(self.input_names)}|{','.join(self.derived_features)}"
+        return f"v{TRANSFORM_VERSION}-{hashlib.sha256(definition.encode()).hexdigest()[:12]}"
+
+    def transform(self, X):
+        """
+        Builds the feature matrix for a batch of raw inputs.
+
+        Args:
+            X (array-like): 2D array of raw inputs in input_names order.
+
+        Returns:
+            np.ndarray: float32 array with one column per output_names entry.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if not self.derived_features:
+            return X
+        cols = {name: X[:, j] for j, name in enumerate(self.input_names)}
+        derived = [DERIVED_FEATURES[name](cols) for name in self.derived_features]
+        return np.column_stack([X] + derived).astype(np.float32, copy=False)
+
+    def transform_frame(self, df):
+        """Transform a DataFrame of raw inputs, keeping its index and naming the output columns"""
+        import pandas as pd
+        return pd.DataFrame(self.transform(df[self.input_names].to_numpy()),
+                            index=df.index, columns=self.output_names)
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import numpy as np
+
+ARRAY_NAMES = ["left", "right", "feature", "threshold", "value", "roots"]
+CURRENT_FILE = "CURRENT"
+
+class FlatForest:
+    """
+    Random forest predictor over flat node arrays.
+
+    All trees of a fitted RandomForestClassifier are concatenated into one set
+    of NumPy arrays (children, split feature, threshold, leaf class
+    probabilities). Saved as .npy files they can be memory-mapped read-only, so
+    every process serving the model shares a single copy through the page
+    cache. Prediction walks all trees for a whole batch at once, one tree level
+    per step, and matches RandomForestClassifier.predict_proba.
+    """
+
+    def __init__(self, arrays, meta):
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+        self.classes_ = np.asarray(meta["classes"])
+        self.n_estimators = len(self.roots)
+        self.max_depth = meta["max_depth"]
+        self.tree_depth = meta["tree_depth"]
+        self.n_features_in_ = meta["n_features"]
+        self.feature_transform_version_ = meta.get("feature_transform_version")
+
+    @classmethod
+    def from_model(cls, model):
+        """Flatten the trees of a fitted RandomForestClassifier"""
+        lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            node_ids = np.arange(offset, offset + n, dtype=np.int32)
+            is_leaf = tree.children_left == -1
+            # Leaves point to themselves so every row can take the same number of steps
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset).astype(np.int32))
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            value = tree.value[:, 0, :].astype(np.float64)
+            values.append(value / np.maximum(value.sum(axis=1, keepdims=True), 1e-12))
+            roots.append(offset)
+            offset += n
+
+        arrays = {
+            "left": np.concatenate(lefts),
+            "right": np.concatenate(rights),
+            "feature": np.concatenate(features),
+            "threshold": np.concatenate(thresholds),
+            "value": np.concatenate(values),
+            "roots": np.asarray(roots, dtype=np.int64)
+        }
+        meta = {
+            "classes": model.classes_.tolist(),
+            "max_depth": model.max_depth,
+            "tree_depth": int(max(e.tree_.max_depth for e in model.estimators_)),
+            "n_features": int(model.n_features_in_),
+            "feature_transform_version": getattr(model, "feature_transform_version_", None)
+        }
+        return cls(arrays, meta)
+
+    def save(self, directory):
+        """Write the node arrays as .npy files plus a meta.json"""
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump(self.meta, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """Load a saved forest, memory-mapping the node arrays read-only by default"""
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in ARRAY_NAMES}
+        with open(os.path.join(directory, "meta.json"), "r") as f:
+            meta = json.load(f)
+        return cls(arrays, meta)
+
+    @property
+    def nbytes(self):
+        return int(sum(getattr(self, name).nbytes for name in ARRAY_NAMES))
+
+    def apply(self, X, trees=None):
+        """
+        Returns the leaf reached in each tree for each row.
+
+        Args:
+            X (array-like): 2D feature matrix.
+            trees (array-like): Optional tree indices to evaluate; all trees by default.
+
+        Returns:
+            np.ndarray: Leaf node ids of shape (rows, trees).
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        roots = self.roots if trees is None else self.roots[trees]
+        flat_X = X.ravel()
+        row_offsets = (np.arange(X.shape[0]) * X.shape[1])[:, np.newaxis]
+        nodes = np.broadcast_to(roots, (X.shape[0], len(roots))).astype(np.intp)
+        for _ in range(self.tree_depth):
+            left = self.left[nodes]
+            if np.array_equal(left, nodes):
+                break  # every row has reached a leaf in every tree
+            go_left = flat_X[row_offsets + self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, left, self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X, trees=None, max_block=32768):
+        """
+        Mean leaf class probabilities over the selected trees.
+
+        Trees are evaluated in groups sized so that rows x trees stays under
+        max_block, bounding the temporary arrays for large batches.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        trees = np.arange(self.n_estimators) if trees is None else np.asarray(trees)
+        chunk_size = max(1, max_block // max(X.shape[0], 1))
+        proba = np.zeros((X.shape[0], len(self.classes_)))
+        for start in range(0, len(trees), chunk_size):
+            leaves = self.apply(X, trees[start:start + chunk_size])
+            proba += self.value[leaves].sum(axis=1)
+        return proba / len(trees)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def predict_early_exit(self, X, confidence=1.0, chunk_size=10, trees=None):
+        """
+        Evaluates trees in chunks and stops for each row once its vote is decided.
+
+        After each chunk the leading class's summed probability is compared
+        with the runner-up. With confidence=1.0 a row stops only when the
+        margin exceeds the number of trees left, so the argmax is exactly that
+        of predict_proba. With confidence < 1 a row also stops once a Hoeffding
+        bound on the per-tree margin (range [-1, 1]) rules out a reversal with
+        probability 1 - confidence: margin > sqrt(2 * t * ln(1 / (1 - confidence))).
+
+        Returns:
+            tuple: Predicted class index per row, class probabilities averaged
+                over the trees each row evaluated, and the number of trees used.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        trees = np.arange(self.n_estimators) if trees is None else np.asarray(trees)
+        n_trees = len(trees)
+        log_delta = np.log(1.0 / (1.0 - confidence)) if confidence < 1.0 else None
+        sums = np.zeros((X.shape[0], len(self.classes_)))
+        trees_used = np.zeros(X.shape[0], dtype=np.int64)
+        active = np.arange(X.shape[0])
+        for start in range(0, n_trees, chunk_size):
+            if len(active) == 0:
+                break
+            end = min(start + chunk_size, n_trees)
+            leaves = self.apply(X[active], trees[start:end])
+            sums[active] += self.value[leaves].sum(axis=1)
+            trees_used[active] = end
+
+            ranked = np.sort(sums[active], axis=1)
+            margin = ranked[:, -1] - (ranked[:, -2] if ranked.shape[1] > 1 else 0.0)
+            decided = margin > n_trees - end
+            if log_delta is not None:
+                decided |= margin > np.sqrt(2.0 * end * log_delta)
+            active = active[~decided]
+
+        proba = sums / np.maximum(trees_used, 1)[:, np.newaxis]
+        return np.argmax(sums, axis=1), proba, trees_used
+
+def model_digest(model_path):
+    """Content hash of a pickled model, used to name its shared segment"""
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+def publish_segment(model_path, shared_dir):
+    """
+    Exports a pickled model into a new segment and atomically makes it current.
+
+    The segment is written to a temporary directory and renamed into place,
+    then the CURRENT pointer file is replaced, so readers only ever see a
+    complete segment.
+
+    Returns:
+        str: Name of the published segment.
+    """
+    os.makedirs(shared_dir, exist_ok=True)
+    segment = f"segment-{model_digest(model_path)}"
+    segment_path = os.path.join(shared_dir, segment)
+    if not os.path.exists(segment_path):
+        with open(model_path, "rb") as f:
+            forest = FlatForest.from_model(pickle.load(f))
+        tmp_path = f"{segment_path}.tmp-{os.getpid()}"
+        forest.save(tmp_path)
+        try:
+            os.rename(tmp_path, segment_path)
+        except OSError:
+            # Another process published the same segment first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    pointer_tmp = os.path.join(shared_dir, f"{CURRENT_FILE}.tmp-{os.getpid()}")
+    with open(pointer_tmp, "w") as f:
+        f.write(segment)
+    os.replace(pointer_tmp, os.path.join(shared_dir, CURRENT_FILE))
+    return segment
+
+def current_segment(shared_dir):
+    """Return the name of the current segment, or None if nothing was published"""
+    try:
+        with open(os.path.join(shared_dir, CURRENT_FILE), "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def remove_stale_segments(shared_dir, keep=2):
+    """Delete all but the newest segments (mapped files stay valid for processes still using them)"""
+    current = current_segment(shared_dir)
+    segments = sorted(
+        (d for d in os.listdir(shared_dir) if d.startswith("segment-") and ".tmp-" not in d),
+        key=lambda d: os.path.getmtime(os.path.join(shared_dir, d)), reverse=True
+    )
+    for segment in segments[keep:]:
+        if segment != current:
+            shutil.rmtree(os.path.join(shared_dir, segment), ignore_errors=True)
+
+if __name__ == "__main__":
+    # python src/flat_forest.py <model.pkl> <shared_dir>
+    model_file = sys.argv[1] if len(sys.argv) > 1 else "models/serving_model.pkl"
+    target_dir = sys.argv[2] if len(sys.argv) > 2 else "models/shared"
+    published = publish_segment(model_file, target_dir)
+    remove_stale_segments(target_dir)
+    print(f"Published {model_file} as {published} in {target_dir}")
@@ -0,0 +1,295 @@
+import pandas as pd
+import numpy as np
+import yaml
+import pickle
+import json
+import io
+import os
+import time
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from schema import get_column_dtypes, apply_schema, cast_encoded_target
+from drift_sketch import FeatureSketch
+from model_engineering import build_model, save_test_arrays, record_serving_cost
+from model_pruning import prune_model
+
+def load_params():
+    """Load parameters from params.yaml"""
+    with open("params.yaml", "r") as f:
+        params = yaml.safe_load(f)
+    return params
+
+def load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+def save_pickle(obj, path):
+    with open(path, "wb") as f:
+        pickle.dump(obj, f)
+
+def read_new_rows(params):
+    """
+    Reads only the rows appended to the source CSV since the last ingestion.
+
+    Returns:
+        tuple: New rows as a DataFrame (None if there are none) and the byte
+        offset the ingestion state should advance to.
+    """
+    state_file = params["incremental"]["state_file"]
+    file_path = params["data"]["source"]
+    
+    with open(state_file, "r") as f:
+        state = json.load(f)
+    if state["source"] != file_path:
+        raise ValueError(f"Ingestion state belongs to {state['source']}, run the full pipeline for {file_path}")
+    
+    with open(file_path, "rb") as f:
+        header = f.readline()
+        f.seek(state["offset"])
+        new_bytes = f.read()
+    
+    # A last row ingested without a line break comes first and was already consumed
+    tail = state.get("tail", "").encode()
+    start = 0
+    if tail:
+        rest = new_bytes[len(tail):]
+        if not new_bytes.startswith(tail) or (rest and not rest.startswith((b"\n", b"\r\n"))):
+            raise ValueError(f"The last ingested row of {file_path} was changed or had rows appended "
+                             "without a line break, fix the file and run the full pipeline")
+        start = new_bytes.find(b"\n") + 1
+    
+    # Only consume complete lines; a partially written last row is picked up next time
+    complete = new_bytes.rfind(b"\n") + 1
+    if complete <= start or not new_bytes[start:complete].strip():
+        return None, state["offset"]
+    
+    df = pd.read_csv(io.BytesIO(header + new_bytes[start:complete]), dtype=get_column_dtypes(params))
+    return df, state["offset"] + complete
+
+def save_ingest_state(params, offset, n_rows):
+    """Advance the ingestion state past the rows just consumed"""
+    state_file = params["incremental"]["state_file"]
+    with open(state_file, "r") as f:
+        state = json.load(f)
+    state.update({"offset": offset, "tail": "", "rows": state["rows"] + int(n_rows)})
+    with open(state_file, "w") as f:
+        json.dump(state, f, indent=2)
+
+def preprocess_new_rows(df, processed, params):
+    """
+    Applies the preprocessing stage to new rows using the already fitted state.
+
+    Duplicates are dropped within the new rows and against rows already
+    processed, missing values are filled with the medians of the processed
+    data and labels are encoded with the saved encoder.
+    """
+    target_col = params["preprocessing"]["target_column"]
+    
+    if params["preprocessing"]["fill_missing_strategy"] == "median":
+        df = df.fillna(processed.median(numeric_only=True).drop(target_col, errors="ignore"))
+    
+    encoded = params["preprocessing"]["encode_categorical"]
+    if encoded:
+        le = load_pickle(params["preprocessing"]["label_encoder_file"])
+        unknown = set(df[target_col].astype(str)) - set(le.classes_)
+        if unknown:
+            raise ValueError(f"New rows contain unseen labels {sorted(unknown)}, run the full pipeline instead")
+        df[target_col] = le.transform(df[target_col].astype(str)).astype(params["schema"]["encoded_target_dtype"])
+    
+    df = apply_schema(df, params, encoded_target=encoded)
+    
+    if params["preprocessing"]["drop_duplicates"]:
+        df = df.drop_duplicates()
+        existing = set(pd.util.hash_pandas_object(processed[df.columns], index=False))
+        df = df[~pd.util.hash_pandas_object(df, index=False).isin(existing)]
+    
+    # Continue the index of the processed data so train/test membership stays unambiguous
+    df.index = pd.RangeIndex(processed.index.max() + 1, processed.index.max() + 1 + len(df))
+    return df
+
+def holdout_split(X, y, size, random_state):
+    """Split off a holdout share like train_test_split; a single row always stays in training"""
+    if size > 0 and len(X) > 1:
+        return train_test_split(X, y, test_size=size, random_state=random_state)
+    return X, X.iloc[:0], y, y.iloc[:0]
+
+def append_holdout(X_path, y_path, new_X, new_y, encoded, params):
+    """Append new rows to a pickled holdout split and return the combined split"""
+    X = pd.concat([load_pickle(X_path), new_X])
+    y = pd.concat([load_pickle(y_path), new_y])
+    if encoded:
+        # concat of differently-typed parts must not drift from the declared dtype
+        y = cast_encoded_target(y, params)
+    save_pickle(X, X_path)
+    save_pickle(y, y_path)
+    return X, y
+
+def select_training_rows(X_train, y_train, new_index, params):
+    """Pick the rows the new trees are fitted on according to incremental.train_on"""
+    if params["incremental"]["train_on"] == "combined":
+        return X_train, y_train
+    
+    # recent: new rows plus a replay sample of older rows so every class is represented
+    new_mask = X_train.index.isin(new_index)
+    old_y = y_train[~new_mask]
+    replay_index = old_y.groupby(old_y, observed=True).sample(
+        n=params["incremental"]["replay_samples_per_class"], replace=True,
+        random_state=params["training"]["random_state"]
+    ).index
+    fit_index = X_train.index[new_mask].append(replay_index)
+    return X_train.loc[fit_index], y_train.loc[fit_index]
+
+def add_trees(model, X_fit, y_fit, params):
+    """
+    Grows the forest with warm-start semantics.
+
+    The oldest trees are dropped first when the forest would exceed
+    incremental.max_total_estimators. sklearn seeds trees by their position
+    in the forest, so once the cap is reached every run would regrow the
+    same trees; each run therefore fits with its own seed, derived from
+    model.random_state and a run counter kept on the model.
+    """
+    n_new = params["incremental"]["n_new_estimators"]
+    max_total = params["incremental"]["max_total_estimators"]
+    base_seed = model.random_state
+    run = getattr(model, "incremental_runs_", 0) + 1
+    
+    if max_total is not None and len(model.estimators_) + n_new > max_total:
+        n_drop = len(model.estimators_) + n_new - max_total
+        model.estimators_ = model.estimators_[n_drop:]
+        print(f"Dropped the {n_drop} oldest trees to stay within {max_total} trees.")
+    
+    run_seed = None if base_seed is None else int(np.random.SeedSequence([base_seed, run]).generate_state(1)[0])
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + n_new, random_state=run_seed)
+    model.fit(X_fit, y_fit)
+    model.set_params(warm_start=False, random_state=base_seed)
+    model.incremental_runs_ = run
+    return model
+
+def incremental_train():
+    """
+    Updates the data artifacts and the model with rows appended to the source CSV.
+
+    Steps:
+        - Ingests only rows after the recorded offset and appends them to the
+          raw data
+        - Preprocesses them and appends them to the processed, feature, target,
+          test and validation artifacts, split like the full training run
+        - Adds trees to the existing forest, re-measures its serving cost and
+          regenerates the serving model
+        - Optionally compares against a full retrain on the same data
+
+    Returns:
+        dict: Incremental training metrics, or None if there were no new rows.
+    """
+    params = load_params()
+    target_col = params["preprocessing"]["target_column"]
+    encoded = params["preprocessing"]["encode_categorical"]
+    
+    new_df, new_offset = read_new_rows(params)
+    if new_df is None:
+        print("No new rows to ingest.")
+        return None
+    print(f"Ingested {len(new_df)} new rows.")
+    
+    # Keep the raw artifact equal to the source CSV, duplicates included
+    raw = load_pickle("data/raw_data.pkl")
+    save_pickle(apply_schema(pd.concat([raw, new_df], ignore_index=True), params), "data/raw_data.pkl")
+    del raw
+    
+    processed = load_pickle("data/processed_data.pkl")
+    new_df = preprocess_new_rows(new_df, processed, params)
+    print(f"{len(new_df)} new rows after preprocessing.")
+    if new_df.empty:
+        save_ingest_state(params, new_offset, 0)
+        print("All new rows were duplicates, model left unchanged.")
+        return None
+    
+    # Append to the processed artifacts
+    save_pickle(apply_schema(pd.concat([processed, new_df]), params, encoded_target=encoded),
+                "data/processed_data.pkl")
+    del processed
+    
+    transform = load_pickle(params["features"]["transform_file"])
+    new_X = transform.transform_frame(new_df.drop(columns=[target_col]))
+    new_y = new_df[target_col]
+    X = pd.concat([load_pickle("data/features.pkl"), new_X])
+    y = pd.concat([load_pickle("data/target.pkl"), new_y])
+    if encoded:
+        # concat of differently-typed parts must not drift from the declared dtype
+        y = cast_encoded_target(y, params)
+    save_pickle(X, "data/features.pkl")
+    save_pickle(y, "data/target.pkl")
+    
+    # Keep the test and validation holdouts growing with the same proportions as
+    # the full split, so neither is ever fitted on
+    random_state = params["training"]["random_state"]
+    new_X_train, new_X_test, new_y_train, new_y_test = holdout_split(
+        new_X, new_y, params["training"]["test_size"], random_state)
+    _, new_X_val, _, new_y_val = holdout_split(
+        new_X_train, new_y_train, params["training"]["validation_size"], random_state)
+    X_test, y_test = append_holdout("data/test_features.pkl", "data/test_target.pkl",
+                                    new_X_test, new_y_test, encoded, params)
+    save_test_arrays(X_test, y_test, params)
+    X_val, _ = append_holdout("data/val_features.pkl", "data/val_target.pkl",
+                              new_X_val, new_y_val, encoded, params)
+    
+    # Update the drift reference with the new training distribution
+    reference_path = params["drift"]["reference_sketch"]
+    if os.path.exists(reference_path):
+        reference = FeatureSketch.load(reference_path)
+        reference.update(new_X[reference.feature_names].to_numpy())
+        reference.save(reference_path)
+    
+    train_mask = ~X.index.isin(X_test.index.append(X_val.index))
+    X_train, y_train = X[train_mask], y[train_mask]
+    X_fit, y_fit = select_training_rows(X_train, y_train, new_X.index, params)
+    
+    model = load_pickle("models/model.pkl")
+    start = time.perf_counter()
+    model = add_trees(model, X_fit, y_fit, params)
+    incremental_seconds = time.perf_counter() - start
+    save_pickle(model, "models/model.pkl")
+    
+    incremental_acc = accuracy_score(y_test, model.predict(X_test))
+    print(f"Incremental model: {len(model.estimators_)} trees, accuracy {incremental_acc:.4f}, "
+          f"fitted in {incremental_seconds:.2f}s on {len(X_fit)} rows")
+    
+    # The grown forest costs more to serve; keep the cost metrics current
+    record_serving_cost("models/model.pkl", X_test, params)
+    
+    # Regenerate the serving model the API loads from the updated forest
+    prune_model()
+    
+    metrics = {
+        "new_rows": int(len(new_df)),
+        "train_on": params["incremental"]["train_on"],
+        "n_estimators": int(len(model.estimators_)),
+        "incremental_accuracy": float(incremental_acc),
+        "incremental_fit_seconds": float(incremental_seconds)
+    }
+    
+    if params["incremental"]["compare_full_retrain"]:
+        full_model = build_model(params["model"])
+        start = time.perf_counter()
+        full_model.fit(X_train, y_train)
+        full_seconds = time.perf_counter() - start
+        full_acc = accuracy_score(y_test, full_model.predict(X_test))
+        print(f"Full retrain: accuracy {full_acc:.4f}, fitted in {full_seconds:.2f}s on {len(X_train)} rows")
+        metrics.update({
+            "full_retrain_accuracy": float(full_acc),
+            "full_retrain_fit_seconds": float(full_seconds),
+            "accuracy_gap": float(full_acc - incremental_acc)
+        })
+    
+    os.makedirs("metrics", exist_ok=True)
+    with open(params["incremental"]["metrics_file"], "w") as f:
+        json.dump(metrics, f, indent=2)
+    
+    # Only advance the offset once every artifact has been updated
+    save_ingest_state(params, new_offset, len(new_df))
+    
+    return metrics
+
+if __name__ == "__main__":
+    incremental_train()
@@ -1,8 +1,12 @@
 import yaml
 import pickle
 import os
+import json
+import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
+from schema import memory_usage_mb, log_memory
+from serving_cost import measure_serving_cost
 
 def load_params():
     """Load parameters from params.yaml"""
@@ -10,6 +14,42 @@ def load_params():
         params = yaml.safe_load(f)
     return params
 
+def build_model(model_params):
+    """Create an unfitted Random Forest from the model section of params.yaml"""
+    return RandomForestClassifier(
+        n_estimators=model_params["n_estimators"],
+        max_depth=model_params["max_depth"] if model_params["max_depth"] is not None else None,
+        min_samples_split=model_params["min_samples_split"],
+        min_samples_leaf=model_params["min_samples_leaf"],
+        max_features=model_params["max_features"],
+        max_leaf_nodes=model_params["max_leaf_nodes"] if model_params["max_leaf_nodes"] is not None else None,
+        min_impurity_decrease=model_params["min_impurity_decrease"],
+        bootstrap=model_params["bootstrap"],
+        oob_score=model_params["oob_score"],
+        criterion=model_params["criterion"],
+        random_state=model_params["random_state"]
+    )
+
+def save_test_arrays(X_test, y_test, params):
+    """Write the holdout as .npy arrays that streaming evaluation can memory-map"""
+    np.save(params["evaluation"]["test_features_array"], X_test.to_numpy(dtype=np.float32))
+    np.save(params["evaluation"]["test_target_array"], np.asarray(y_test))
+
+def record_serving_cost(model_path, X_test, params):
+    """Measure what the saved model costs to serve and write it to the serving cost metrics"""
+    cost_params = params["serving_cost"]
+    serving_cost = measure_serving_cost(
+        model_path, X_test,
+        repeats=cost_params["repeats"],
+        batch_size=cost_params["batch_size"],
+        random_state=params["training"]["random_state"]
+    )
+    print(f"Serving cost: {serving_cost}")
+    os.makedirs("metrics", exist_ok=True)
+    with open(cost_params["metrics_file"], "w") as f:
+        json.dump(serving_cost, f, indent=2)
+    return serving_cost
+
 def train_model():
     """
     Trains a Random Forest Classifier on the dataset.
@@ -32,25 +72,30 @@ def train_model():
         test_size=params["training"]["test_size"], 
         random_state=params["training"]["random_state"]
     )
+    log_memory("model_training", memory_usage_mb(X) + memory_usage_mb(y),
+               sum(memory_usage_mb(part) for part in (X_train, X_test, y_train, y_test)))
+    
+    # Optional validation split held out of fitting, used by model pruning
+    validation_size = params["training"]["validation_size"]
+    if validation_size > 0:
+        X_train, X_val, y_train, y_val = train_test_split(
+            X_train, y_train,
+            test_size=validation_size,
+            random_state=params["training"]["random_state"]
+        )
+    else:
+        X_val, y_val = X_train.iloc[:0], y_train.iloc[:0]
 
     # Extract model parameters
     model_params = params["model"]
     
-    model = RandomForestClassifier(
-        n_estimators=model_params["n_estimators"],
-        max_depth=model_params["max_depth"] if model_params["max_depth"] is not None else None,
-        min_samples_split=model_params["min_samples_split"],
-        min_samples_leaf=model_params["min_samples_leaf"],
-        max_features=model_params["max_features"],
-        max_leaf_nodes=model_params["max_leaf_nodes"] if model_params["max_leaf_nodes"] is not None else None,
-        min_impurity_decrease=model_params["min_impurity_decrease"],
-        bootstrap=model_params["bootstrap"],
-        oob_score=model_params["oob_score"],
-        criterion=model_params["criterion"],
-        random_state=model_params["random_state"]
-    )
+    model = build_model(model_params)
 
     model.fit(X_train, y_train)
+    
+    # Version the model with the feature transform it was trained on
+    with open(params["features"]["transform_file"], "rb") as f:
+        model.feature_transform_version_ = pickle.load(f).version
     print("Model training completed.")
     print(f"Model parameters: n_estimators={model_params['n_estimators']}, max_depth={model_params['max_depth']}, "
           f"min_samples_split={model_params['min_samples_split']}, min_samples_leaf={model_params['min_samples_leaf']}")
@@ -65,6 +110,17 @@ def train_model():
     
     with open("data/test_target.pkl", "wb") as f:
         pickle.dump(y_test, f)
+    
+    save_test_arrays(X_test, y_test, params)
+    
+    with open("data/val_features.pkl", "wb") as f:
+        pickle.dump(X_val, f)
+    
+    with open("data/val_target.pkl", "wb") as f:
+        pickle.dump(y_val, f)
+    
+    # Record what this configuration costs to serve, next to its accuracy metrics
+    record_serving_cost("models/model.pkl", X_test, params)
 
     return model, X_test, y_test
 
@@ -2,12 +2,13 @@ import yaml
 import pickle
 import json
 import os
+import hashlib
+import multiprocessing
 import numpy as np
-import matplotlib.pyplot as plt
 import pandas as pd
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 from sklearn.model_selection import cross_val_score
-import seaborn as sns
+from flat_forest import FlatForest
 
 def load_params():
     """Load parameters from params.yaml"""
@@ -15,10 +16,196 @@ def load_params():
         params = yaml.safe_load(f)
     return params
 
+def plot_data_hash(cm, feature_importances, dpi):
+    """Return a digest of everything the evaluation plots are drawn from"""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(cm).tobytes())
+    digest.update(np.ascontiguousarray(feature_importances.values).tobytes())
+    digest.update(",".join(map(str, feature_importances.index)).encode())
+    digest.update(str(dpi).encode())
+    return digest.hexdigest()
+
+def render_plots(cm, feature_importances, outputs, dpi, cache_file, data_hash):
+    """
+    Renders the feature importance and confusion matrix plots.
+
+    Runs in a worker process, so plotting libraries are imported here and the
+    cache file is only updated once both figures have been written.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # Feature importance plot
+    plt.figure(figsize=(10, 6))
+    feature_importances.sort_values().plot(kind='barh', title="Feature Importance")
+    plt.tight_layout()
+    plt.savefig(outputs["feature_importance_plot"], dpi=dpi, bbox_inches='tight')
+    plt.close()
+    
+    # Confusion matrix plot
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
+    plt.title('Confusion Matrix')
+    plt.ylabel('True Label')
+    plt.xlabel('Predicted Label')
+    plt.tight_layout()
+    plt.savefig(outputs["confusion_matrix_plot"], dpi=dpi, bbox_inches='tight')
+    plt.close()
+
+    with open(cache_file, "w") as f:
+        f.write(data_hash)
+    print("Evaluation plots rendered.")
+
+def start_plot_rendering(cm, feature_importances, params):
+    """
+    Renders the evaluation plots in a background process.
+
+    Rendering is skipped when the plot data hash matches the one recorded for
+    the plots already on disk.
+
+    Returns:
+        multiprocessing.Process or None: The rendering process, if one was started.
+    """
+    outputs = params["outputs"]
+    dpi = params["evaluation"]["plot_dpi"]
+    cache_file = params["evaluation"]["plot_cache_file"]
+    plot_files = [outputs["feature_importance_plot"], outputs["confusion_matrix_plot"]]
+    data_hash = plot_data_hash(cm, feature_importances, dpi)
+
+    if all(os.path.exists(path) for path in plot_files) and os.path.exists(cache_file):
+        with open(cache_file, "r") as f:
+            if f.read().strip() == data_hash:
+                print("Plot data unchanged, skipping plot rendering.")
+                return None
+
+    for path in plot_files + [cache_file]:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    # Non-daemon, so the interpreter waits for the plots before the stage exits
+    process = multiprocessing.Process(
+        target=render_plots,
+        args=(cm, feature_importances, outputs, dpi, cache_file, data_hash)
+    )
+    process.start()
+    return process
+
+def early_exit_counts(flat, X, y_true, y_pred, early_exit_params):
+    """Trees evaluated, correct predictions and agreements with the full forest for a block of rows"""
+    columns, _, trees_used = flat.predict_early_exit(
+        np.asarray(X, dtype=np.float32),
+        confidence=early_exit_params["confidence"],
+        chunk_size=early_exit_params["chunk_size"]
+    )
+    early_pred = flat.classes_[columns]
+    return np.array([trees_used.sum(), np.sum(early_pred == y_true), np.sum(early_pred == y_pred)])
+
+def early_exit_metrics(counts, n_rows, n_trees):
+    """
+    Summarises early-exit inference on the test set.
+
+    Returns:
+        dict: Average trees evaluated per row, accuracy and agreement with the full forest.
+    """
+    trees_evaluated, correct, agreed = counts
+    return {
+        "early_exit_avg_trees": float(trees_evaluated / n_rows),
+        "early_exit_tree_fraction": float(trees_evaluated / n_rows / n_trees),
+        "early_exit_accuracy": float(correct / n_rows),
+        "early_exit_agreement": float(agreed / n_rows)
+    }
+
+def accumulate_confusion(cm, classes, y_true, y_pred):
+    """Add a block of predictions to a confusion matrix indexed by the model's classes"""
+    n_classes = len(classes)
+    cells = np.searchsorted(classes, y_true) * n_classes + np.searchsorted(classes, y_pred)
+    cm += np.bincount(cells, minlength=n_classes * n_classes).reshape(n_classes, n_classes)
+
+def trim_confusion(cm, classes):
+    """Keep the labels present in y_true or y_pred, as sklearn's confusion_matrix does"""
+    present = (cm.sum(axis=0) + cm.sum(axis=1)) > 0
+    return cm[np.ix_(present, present)], classes[present]
+
+def classification_report_from_confusion(cm, labels, digits=2):
+    """
+    Builds the classification report text from a confusion matrix.
+
+    Produces the same layout and values as sklearn's classification_report on
+    the underlying predictions (zero_division=0), without needing them.
+    """
+    tp = np.diag(cm).astype(np.float64)
+    support = cm.sum(axis=1)
+    predicted = cm.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        f1 = np.where(support + predicted > 0, 2 * tp / (support + predicted), 0.0)
+    total = int(support.sum())
+
+    names = [str(label) for label in labels]
+    width = max(max(len(name) for name in names), len("weighted avg"), digits)
+    headers = ["precision", "recall", "f1-score", "support"]
+    report = ("{:>{width}s} " + " {:>9}" * len(headers)).format("", *headers, width=width) + "\n\n"
+    row_fmt = "{:>{width}s} " + " {:>9.{digits}f}" * 3 + " {:>9}\n"
+    for name, p, r, f, n in zip(names, precision, recall, f1, support):
+        report += row_fmt.format(name, p, r, f, int(n), width=width, digits=digits)
+    report += "\n"
+    accuracy_fmt = "{:>{width}s} " + " {:>9.{digits}}" * 2 + " {:>9.{digits}f}" + " {:>9}\n"
+    report += accuracy_fmt.format("accuracy", "", "", tp.sum() / total, total, width=width, digits=digits)
+    report += row_fmt.format("macro avg", precision.mean(), recall.mean(), f1.mean(), total,
+                             width=width, digits=digits)
+    weights = support / total
+    report += row_fmt.format("weighted avg", precision @ weights, recall @ weights, f1 @ weights, total,
+                             width=width, digits=digits)
+    return report
+
+def iter_holdout_chunks(params, feature_names):
+    """Yield (features, target) chunks of the memory-mapped holdout arrays"""
+    X_test = np.load(params["evaluation"]["test_features_array"], mmap_mode="r")
+    y_test = np.load(params["evaluation"]["test_target_array"], mmap_mode="r")
+    chunk_rows = params["evaluation"]["chunk_rows"]
+    for start in range(0, len(y_test), chunk_rows):
+        stop = start + chunk_rows
+        yield pd.DataFrame(X_test[start:stop], columns=feature_names), np.asarray(y_test[start:stop])
+
+def evaluate_streaming(model, params):
+    """
+    Evaluates the holdout chunk by chunk.
+
+    Only one chunk of the memory-mapped test arrays is in memory at a time;
+    the confusion matrix (and early-exit counts) are accumulated across
+    chunks and every metric is derived from them.
+
+    Returns:
+        tuple: Confusion matrix, its labels and early-exit metrics (or None).
+    """
+    classes = model.classes_
+    cm = np.zeros((len(classes), len(classes)), dtype=np.int64)
+    early_exit = params["early_exit"]
+    flat = FlatForest.from_model(model) if early_exit["evaluate"] else None
+    counts = np.zeros(3)
+    n_rows = 0
+    for X_chunk, y_chunk in iter_holdout_chunks(params, model.feature_names_in_):
+        y_pred = model.predict(X_chunk)
+        accumulate_confusion(cm, classes, y_chunk, y_pred)
+        if flat is not None:
+            counts += early_exit_counts(flat, X_chunk, y_chunk, y_pred, early_exit)
+        n_rows += len(y_chunk)
+    
+    early_exit_result = early_exit_metrics(counts, n_rows, flat.n_estimators) if flat is not None else None
+    cm, labels = trim_confusion(cm, classes)
+    return cm, labels, early_exit_result
+
 def evaluate_model():
     """
     Evaluates the trained model on test data.
 
+    Plot rendering starts in a background process as soon as the confusion
+    matrix exists (unless evaluation.mode is "metrics_only"), so it overlaps
+    cross-validation. With evaluation.streaming the holdout is predicted in
+    chunks. evaluation.cv_folds: 0 skips cross-validation in either mode.
+
     Returns:
         dict: Evaluation metrics.
     """
@@ -28,69 +215,128 @@ def evaluate_model():
     with open("models/model.pkl", "rb") as f:
         model = pickle.load(f)
     
+    if params["evaluation"]["streaming"]:
+        return evaluate_model_streaming(model, params)
+    
     with open("data/test_features.pkl", "rb") as f:
         X_test = pickle.load(f)
     
     with open("data/test_target.pkl", "rb") as f:
         y_test = pickle.load(f)
     
-    with open("data/features.pkl", "rb") as f:
-        X = pickle.load(f)
-    
-    with open("data/target.pkl", "rb") as f:
-        y = pickle.load(f)
-    
     # Make predictions
     y_pred = model.predict(X_test)
 
     # Calculate metrics
     acc = accuracy_score(y_test, y_pred)
+    cm = confusion_matrix(y_test, y_pred)
+    plot_process = start_plots(cm, model, X_test.columns, params)
     
     # Cross-validation
-    cv_scores = cross_val_score(model, X, y, cv=params["evaluation"]["cv_folds"])
-    cv_mean = np.mean(cv_scores)
-    cv_std = np.std(cv_scores)
+    cv_mean, cv_std = cross_validate(model, params)
     
     print("Model evaluation completed.")
     print(f"Accuracy: {acc:.4f}")
-    print(f"CV Accuracy: {cv_mean:.4f} (+/- {cv_std * 2:.4f})")
+    print_cv(cv_mean, cv_std)
     print("Classification Report:\n", classification_report(y_test, y_pred))
-    print("Confusion Matrix:\n", confusion_matrix(y_test, y_pred))
+    print("Confusion Matrix:\n", cm)
 
     # Save metrics
     metrics = {
         "accuracy": float(acc),
-        "cv_accuracy_mean": float(cv_mean),
-        "cv_accuracy_std": float(cv_std)
+        "cv_accuracy_mean": cv_mean,
+        "cv_accuracy_std": cv_std
     }
     
-    os.makedirs("metrics", exist_ok=True)
-    with open(params["evaluation"]["metrics_file"], "w") as f:
-        json.dump(metrics, f, indent=2)
+    if params["early_exit"]["evaluate"]:
+        flat = FlatForest.from_model(model)
+        counts = early_exit_counts(flat, X_test, y_test, y_pred, params["early_exit"])
+        metrics.update(early_exit_metrics(counts, len(y_test), flat.n_estimators))
     
-    # Generate plots
-    os.makedirs("plots", exist_ok=True)
+    save_metrics(metrics, model, params)
+    finish_plots(plot_process)
+    return metrics
+
+def evaluate_model_streaming(model, params):
+    """Streaming variant of evaluate_model; see evaluate_streaming"""
+    if params["evaluation"]["cv_folds"]:
+        print("Warning: cross-validation loads the full dataset and refits the model, so memory "
+              "still grows with the data; set evaluation.cv_folds: 0 to keep streaming evaluation bounded.")
+    cm, labels, early_exit_result = evaluate_streaming(model, params)
+    plot_process = start_plots(cm, model, model.feature_names_in_, params)
+    acc = np.trace(cm) / cm.sum()
+    cv_mean, cv_std = cross_validate(model, params)
     
-    # Feature importance plot
-    feature_importances = pd.Series(model.feature_importances_, index=X.columns)
-    plt.figure(figsize=(10, 6))
-    feature_importances.sort_values().plot(kind='barh', title="Feature Importance")
-    plt.tight_layout()
-    plt.savefig("plots/feature_importance.png", dpi=300, bbox_inches='tight')
-    plt.close()
+    print("Model evaluation completed (streaming).")
+    print(f"Accuracy: {acc:.4f}")
+    print_cv(cv_mean, cv_std)
+    print("Classification Report:\n", classification_report_from_confusion(cm, labels))
+    print("Confusion Matrix:\n", cm)
     
-    # Confusion matrix plot
-    plt.figure(figsize=(8, 6))
-    cm = confusion_matrix(y_test, y_pred)
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
-    plt.title('Confusion Matrix')
-    plt.ylabel('True Label')
-    plt.xlabel('Predicted Label')
-    plt.tight_layout()
-    plt.savefig("plots/confusion_matrix.png", dpi=300, bbox_inches='tight')
-    plt.close()
-
+    metrics = {
+        "accuracy": float(acc),
+        "cv_accuracy_mean": cv_mean,
+        "cv_accuracy_std": cv_std
+    }
+    if early_exit_result is not None:
+        metrics.update(early_exit_result)
+    
+    save_metrics(metrics, model, params)
+    finish_plots(plot_process)
     return metrics
 
+def cross_validate(model, params):
+    """
+    Cross-validates the model configuration on the full dataset.
+
+    Returns:
+        tuple: Mean and standard deviation of the fold accuracies, or
+            (None, None) when evaluation.cv_folds is 0.
+    """
+    cv_folds = params["evaluation"]["cv_folds"]
+    if not cv_folds:
+        return None, None
+    
+    with open("data/features.pkl", "rb") as f:
+        X = pickle.load(f)
+    
+    with open("data/target.pkl", "rb") as f:
+        y = pickle.load(f)
+    
+    cv_scores = cross_val_score(model, X, y, cv=cv_folds)
+    return float(np.mean(cv_scores)), float(np.std(cv_scores))
+
+def print_cv(cv_mean, cv_std):
+    """Print the cross-validation result, or that it was skipped"""
+    if cv_mean is None:
+        print("Cross-validation skipped (evaluation.cv_folds: 0).")
+    else:
+        print(f"CV Accuracy: {cv_mean:.4f} (+/- {cv_std * 2:.4f})")
+
+def start_plots(cm, model, feature_names, params):
+    """Start background plot rendering unless in metrics-only mode"""
+    if params["evaluation"]["mode"] == "metrics_only":
+        print("Metrics-only evaluation mode, skipping plot rendering.")
+        return None
+    feature_importances = pd.Series(model.feature_importances_, index=feature_names)
+    return start_plot_rendering(cm, feature_importances, params)
+
+def finish_plots(process):
+    """Wait for the plot rendering process, if any, and report a failure"""
+    if process is not None:
+        process.join()
+        if process.exitcode != 0:
+            print(f"Plot rendering failed with exit code {process.exitcode}.")
+
+def save_metrics(metrics, model, params):
+    """Write the metrics file"""
+    if "early_exit_avg_trees" in metrics:
+        print(f"Early exit: {metrics['early_exit_avg_trees']:.1f} of {model.n_estimators} trees per row, "
+              f"agreement with full forest {metrics['early_exit_agreement']:.4f}")
+    
+    os.makedirs("metrics", exist_ok=True)
+    with open(params["evaluation"]["metrics_file"], "w") as f:
+        json.dump(metrics, f, indent=2)
+
 if __name__ == "__main__":
     evaluate_model()
@@ -0,0 +1,230 @@
+import yaml
+import pickle
+import json
+import os
+import shutil
+import numpy as np
+from flat_forest import FlatForest
+from serving_cost import measure_serving_cost
+
+def load_params():
+    """Load parameters from params.yaml"""
+    with open("params.yaml", "r") as f:
+        params = yaml.safe_load(f)
+    return params
+
+def top3_sets(proba):
+    """
+    Sorted indices of the three most probable classes per row, from summed
+    tree probabilities; classes with no more than one tree's worth of votes
+    (a 1/n_trees share) are single-tree noise or ties at zero and become -1.
+    """
+    top = np.argsort(-proba, axis=1, kind="stable")[:, :3]
+    significant = np.take_along_axis(proba, top, axis=1) > 1
+    return np.sort(np.where(significant, top, -1), axis=1)
+
+def top3_agreement(proba, in_top3, top3_size):
+    """
+    Whether each row's top-3 set (as in top3_sets) equals the reference set.
+
+    Compares the reference classes against the best other class instead of
+    sorting, so it broadcasts over a leading candidate axis of proba. A tie
+    between a reference class and another significant class disagrees.
+
+    Args:
+        proba: Summed class probabilities, shape (..., rows, classes).
+        in_top3: Reference top-3 membership, shape (rows, classes).
+        top3_size: Number of reference classes per row.
+    """
+    weakest = np.where(in_top3, proba, np.inf).min(axis=-1)
+    strongest_other = np.where(in_top3, -np.inf, proba).max(axis=-1)
+    return (weakest > 1) & np.where(top3_size < 3, strongest_other <= 1, strongest_other < weakest)
+
+def forest_proba(leaves, leaf_proba):
+    """Summed class probabilities over all trees, accumulated one tree at a time"""
+    total = np.zeros((leaves.shape[0], leaf_proba.shape[1]))
+    for t in range(leaves.shape[1]):
+        total += leaf_proba[leaves[:, t]]
+    return total
+
+def select_trees(leaves, leaf_proba, y_columns, full_top3, accuracy_tolerance, min_top3_agreement,
+                 min_trees, max_block=4_000_000):
+    """
+    Greedy forward selection of trees.
+
+    Repeatedly adds the tree that gives the highest validation accuracy for the
+    current subset (ties broken by top-3 agreement with the full forest), until
+    the subset is within accuracy_tolerance of the full forest and its top-3
+    predictions agree with the full forest on at least min_top3_agreement of
+    the rows.
+
+    Per-tree votes are kept as leaf ids and looked up in the leaf probability
+    table when needed; candidates are scored in blocks of at most max_block
+    rows x candidates x classes values, so memory stays bounded. Each step only
+    scores accuracy on rows whose leading class one more tree could still
+    overtake, and agreement only for the candidates tied at the best accuracy.
+
+    Args:
+        leaves: Leaf node id reached in each tree, shape (rows, trees).
+        leaf_proba: Class probabilities of every node, shape (nodes, classes).
+        y_columns: True class column index per row.
+        full_top3: Top-3 class sets of the full forest (see top3_sets).
+
+    Returns:
+        tuple: Selected tree indices in selection order, and the subset's
+        accuracy and top-3 agreement.
+    """
+    n_rows, n_trees = leaves.shape
+    n_classes = leaf_proba.shape[1]
+    full_acc = np.mean(np.argmax(forest_proba(leaves, leaf_proba), axis=1) == y_columns)
+    in_top3 = np.zeros((n_rows, n_classes), dtype=bool)
+    rows, slots = np.nonzero(full_top3 >= 0)
+    in_top3[rows, full_top3[rows, slots]] = True
+    top3_size = in_top3.sum(axis=1)
+    remaining = np.ones(n_trees, dtype=bool)
+    running = np.zeros((n_rows, n_classes), dtype=leaf_proba.dtype)
+    selected = []
+
+    def score(candidates, row_mask, metric):
+        # metric maps candidate probabilities (candidates, rows, classes) to per-row hits
+        scores = np.empty(len(candidates))
+        block = max(1, max_block // (max(1, row_mask.sum()) * n_classes))
+        row_leaves = leaves[row_mask]
+        for start in range(0, len(candidates), block):
+            chunk = candidates[start:start + block]
+            candidate_proba = running[row_mask] + np.transpose(leaf_proba[row_leaves[:, chunk]], (1, 0, 2))
+            scores[start:start + block] = np.sum(metric(candidate_proba, row_mask), axis=1)
+        return scores
+
+    while remaining.any():
+        candidates = np.flatnonzero(remaining)
+
+        # A tree adds at most 1 to any class, so rows led by more than 1 keep their prediction
+        top2 = np.partition(running, n_classes - 2, axis=1)[:, -2:]
+        open_rows = top2[:, 1] - top2[:, 0] <= 1
+        fixed_hits = np.sum((np.argmax(running, axis=1) == y_columns)[~open_rows])
+        hits = fixed_hits + score(candidates, open_rows,
+                                  lambda proba, mask: np.argmax(proba, axis=2) == y_columns[mask])
+
+        tied = candidates[hits == hits.max()]
+        if len(tied) > 1:
+            agreements = score(tied, np.ones(n_rows, dtype=bool),
+                               lambda proba, mask: top3_agreement(proba, in_top3, top3_size))
+            best = tied[np.argmax(agreements)]
+        else:
+            best = tied[0]
+        selected.append(int(best))
+        remaining[best] = False
+        running += leaf_proba[leaves[:, best]]
+
+        acc = np.mean(np.argmax(running, axis=1) == y_columns)
+        agreement = np.mean(top3_agreement(running, in_top3, top3_size))
+        if len(selected) >= min_trees and acc >= full_acc - accuracy_tolerance and agreement >= min_top3_agreement:
+            break
+
+    return selected, float(acc), float(agreement)
+
+def prune_model():
+    """
+    Selects a subset of the forest's trees that preserves validation accuracy.
+
+    Writes the pruned forest as the serving model, or the unpruned model when
+    pruning.enabled is false, and records tree counts and latency in metrics.
+
+    Returns:
+        dict: Pruning metrics.
+    """
+    params = load_params()
+    prune_params = params["pruning"]
+    serving_model_file = prune_params["serving_model_file"]
+    
+    if not prune_params["enabled"]:
+        shutil.copyfile("models/model.pkl", serving_model_file)
+        with open("models/model.pkl", "rb") as f:
+            n_trees = len(pickle.load(f).estimators_)
+        metrics = {"pruned": False, "n_trees_full": n_trees, "n_trees_pruned": n_trees}
+        print("Pruning disabled, serving the full model.")
+    else:
+        with open("models/model.pkl", "rb") as f:
+            model = pickle.load(f)
+        
+        with open("data/val_features.pkl", "rb") as f:
+            X_val = pickle.load(f)
+        
+        with open("data/val_target.pkl", "rb") as f:
+            y_val = pickle.load(f)
+        
+        if len(X_val) == 0:
+            raise ValueError("Pruning needs a validation split, set training.validation_size > 0")
+        
+        # Bound the selection cost on large datasets with a fixed-seed sample
+        max_rows = prune_params["max_validation_rows"]
+        if max_rows and len(X_val) > max_rows:
+            sample = np.random.default_rng(params["training"]["random_state"]).choice(
+                len(X_val), size=max_rows, replace=False)
+            X_val, y_val = X_val.iloc[np.sort(sample)], y_val.iloc[np.sort(sample)]
+            print(f"Selecting trees on a sample of {max_rows} validation rows.")
+        
+        # Per-tree votes as leaf ids into the flat node arrays
+        forest = FlatForest.from_model(model)
+        leaves = forest.apply(X_val.to_numpy()).astype(np.int32)
+        leaf_proba = forest.value
+        y_columns = np.searchsorted(model.classes_, np.asarray(y_val))
+        full_proba = forest_proba(leaves, leaf_proba)
+        full_acc = float(np.mean(np.argmax(full_proba, axis=1) == y_columns))
+        
+        selected, pruned_acc, agreement = select_trees(
+            leaves, leaf_proba, y_columns, top3_sets(full_proba),
+            prune_params["accuracy_tolerance"],
+            prune_params["min_top3_agreement"],
+            prune_params["min_trees"]
+        )
+        
+        n_trees = len(model.estimators_)
+        model.estimators_ = [model.estimators_[i] for i in sorted(selected)]
+        model.n_estimators = len(model.estimators_)
+        with open(serving_model_file, "wb") as f:
+            pickle.dump(model, f)
+        
+        metrics = {
+            "pruned": True,
+            "n_trees_full": n_trees,
+            "n_trees_pruned": len(selected),
+            "val_accuracy_full": full_acc,
+            "val_accuracy_pruned": pruned_acc,
+            "val_top3_agreement": agreement
+        }
+        print(f"Pruned forest from {n_trees} to {len(selected)} trees "
+              f"(val accuracy {full_acc:.4f} -> {pruned_acc:.4f}, top-3 agreement {agreement:.4f})")
+    
+    # Holdout accuracy and latency of the full versus the serving model; the
+    # validation rows were used to select the trees, so they flatter the subset
+    with open("data/test_features.pkl", "rb") as f:
+        X_test = pickle.load(f)
+    
+    with open("data/test_target.pkl", "rb") as f:
+        y_test = pickle.load(f)
+    
+    for name, path in [("full", "models/model.pkl"), ("pruned", serving_model_file)]:
+        with open(path, "rb") as f:
+            metrics[f"test_accuracy_{name}"] = float(np.mean(pickle.load(f).predict(X_test) == np.asarray(y_test)))
+    print(f"Holdout accuracy: full {metrics['test_accuracy_full']:.4f}, "
+          f"serving {metrics['test_accuracy_pruned']:.4f}")
+    
+    cost_params = params["serving_cost"]
+    full_cost = measure_serving_cost("models/model.pkl", X_test, cost_params["repeats"], cost_params["batch_size"])
+    serving_cost = measure_serving_cost(serving_model_file, X_test, cost_params["repeats"], cost_params["batch_size"])
+    for key in ["model_size_bytes", "single_row_latency_ms", "batch_latency_ms"]:
+        metrics[f"{key}_full"] = full_cost[key]
+        metrics[f"{key}_pruned"] = serving_cost[key]
+    metrics["single_row_latency_reduction"] = 1 - serving_cost["single_row_latency_ms"] / full_cost["single_row_latency_ms"]
+    metrics["batch_latency_reduction"] = 1 - serving_cost["batch_latency_ms"] / full_cost["batch_latency_ms"]
+    
+    os.makedirs("metrics", exist_ok=True)
+    with open(prune_params["metrics_file"], "w") as f:
+        json.dump(metrics, f, indent=2)
+    
+    return metrics
+
+if __name__ == "__main__":
+    prune_model()
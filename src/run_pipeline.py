@@ -6,6 +6,16 @@ import subprocess
 import sys
 import os
 
+# Pipeline stages in execution order, as (name, script in src/)
+STAGES = [
+    ("Data Ingestion", "data_ingestion.py"),
+    ("Data Preprocessing", "data_preprocessing.py"),
+    ("Feature Engineering", "feature_engineering.py"),
+    ("Model Training", "model_engineering.py"),
+    ("Model Pruning", "model_pruning.py"),
+    ("Model Evaluation", "model_evaluation.py")
+]
+
 def run_pipeline():
     """Run the complete ML pipeline"""
     # Change to parent directory to run from project root
@@ -13,22 +23,14 @@ def run_pipeline():
     project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     os.chdir(project_root)
     
-    stages = [
-        ("Data Ingestion", "python src/data_ingestion.py"),
-        ("Data Preprocessing", "python src/data_preprocessing.py"),
-        ("Feature Engineering", "python src/feature_engineering.py"),
-        ("Model Training", "python src/model_engineering.py"),
-        ("Model Evaluation", "python src/model_evaluation.py")
-    ]
-    
     try:
-        for stage_name, command in stages:
+        for stage_name, script in STAGES:
             print(f"\n{'='*50}")
             print(f"Running {stage_name}")
             print(f"{'='*50}")
             
             try:
-                result = subprocess.run(command.split(), check=True, capture_output=True, text=True)
+                result = subprocess.run(["python", os.path.join("src", script)], check=True, capture_output=True, text=True)
                 print(result.stdout)
                 if result.stderr:
                     print("Warnings:", result.stderr)
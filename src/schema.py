@@ -0,0 +1,57 @@
+import os
+import numpy as np
+import pandas as pd
+
+def get_column_dtypes(params, encoded_target=False):
+    """
+    Return the per-column dtype mapping declared under schema.dtypes.
+
+    With encoded_target, the target column maps to schema.encoded_target_dtype
+    instead, for frames whose label has already been label-encoded.
+    """
+    dtypes = dict(params.get("schema", {}).get("dtypes", {}))
+    if encoded_target:
+        dtypes[params["preprocessing"]["target_column"]] = params["schema"]["encoded_target_dtype"]
+    return dtypes
+
+def apply_schema(df, params, encoded_target=False):
+    """
+    Casts the columns of a DataFrame to the dtypes declared in params.yaml.
+
+    Columns missing from the schema (or from the frame) are left untouched,
+    so the same call can be used on the full dataset and on feature subsets.
+
+    Returns:
+        pd.DataFrame: DataFrame with schema dtypes applied.
+    """
+    dtypes = get_column_dtypes(params, encoded_target=encoded_target)
+    casts = {col: dtype for col, dtype in dtypes.items()
+             if col in df.columns and str(df[col].dtype) != str(dtype)}
+    if casts:
+        df = df.astype(casts)
+    return df
+
+def cast_encoded_target(y, params):
+    """Cast an encoded target Series to schema.encoded_target_dtype (e.g. after a concat)"""
+    dtype = params["schema"]["encoded_target_dtype"]
+    return y if str(y.dtype) == str(dtype) else y.astype(dtype)
+
+def memory_usage_mb(obj):
+    """Return the deep in-memory size of a pandas/NumPy object in MB"""
+    if isinstance(obj, pd.DataFrame):
+        size = obj.memory_usage(deep=True).sum()
+    elif isinstance(obj, pd.Series):
+        size = obj.memory_usage(deep=True)
+    elif isinstance(obj, np.ndarray):
+        size = obj.nbytes
+    else:
+        size = 0
+    return size / (1024 ** 2)
+
+def file_size_mb(path):
+    """Return the on-disk size of a file in MB"""
+    return os.path.getsize(path) / (1024 ** 2)
+
+def log_memory(stage, before, after):
+    """Print the memory footprint of a stage's input and output"""
+    print(f"[{stage}] Memory footprint: before={before:.3f} MB, after={after:.3f} MB")
@@ -0,0 +1,128 @@
+"""
+Picks the cheapest experiment within a tolerance of the best accuracy
+
+Reads `dvc exp show --json` output, computes the accuracy vs serving cost
+Pareto front and selects the lowest-cost configuration whose accuracy is
+within --tolerance of the best one.
+
+Usage:
+    python src/select_model.py --cost single_row_latency_ms --tolerance 0.005
+    dvc exp show --json > exps.json && python src/select_model.py --input exps.json
+"""
+import argparse
+import json
+import subprocess
+
+COST_METRICS = ["single_row_latency_ms", "batch_latency_ms", "model_size_bytes", "load_time_ms"]
+
+def load_experiments(input_file=None):
+    """Load `dvc exp show --json` output from a file, or by running dvc"""
+    if input_file:
+        with open(input_file, "r") as f:
+            return json.load(f)
+    result = subprocess.run(["dvc", "exp", "show", "--json"], check=True, capture_output=True, text=True)
+    return json.loads(result.stdout)
+
+def _flatten(prefix, data, out):
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            _flatten(name, value, out)
+        else:
+            out[name] = value
+    return out
+
+def collect_runs(node, name=None, runs=None):
+    """
+    Extracts one record per experiment from `dvc exp show --json` output.
+
+    Walks the nested structure looking for entries whose "data" holds metrics,
+    which covers both the list layout of DVC 3 and the dict layout of DVC 2.
+    Metrics from all metrics files are merged into one dict.
+    """
+    if runs is None:
+        runs = []
+    if isinstance(node, list):
+        for item in node:
+            collect_runs(item, name, runs)
+    elif isinstance(node, dict):
+        data = node.get("data")
+        if isinstance(data, dict) and data.get("metrics"):
+            metrics = {}
+            for metrics_file in data["metrics"].values():
+                metrics.update((metrics_file or {}).get("data") or {})
+            params = {}
+            for params_file in (data.get("params") or {}).values():
+                _flatten("", (params_file or {}).get("data") or {}, params)
+            rev = str(node.get("rev") or data.get("rev") or "")
+            run_name = node.get("name") or data.get("name") or (rev[:7] if len(rev) == 40 else rev) or name
+            runs.append({"name": run_name, "metrics": metrics, "params": params})
+        for key, value in node.items():
+            if key != "data" and isinstance(value, (dict, list)):
+                collect_runs(value, key if isinstance(value, dict) else name, runs)
+    return runs
+
+def pareto_front(runs, accuracy_metric, cost_metric):
+    """Runs not dominated by another run that is at least as accurate and at most as costly"""
+    front = []
+    for run in runs:
+        acc, cost = run["metrics"][accuracy_metric], run["metrics"][cost_metric]
+        dominated = any(
+            other["metrics"][accuracy_metric] >= acc and other["metrics"][cost_metric] <= cost
+            and (other["metrics"][accuracy_metric] > acc or other["metrics"][cost_metric] < cost)
+            for other in runs
+        )
+        if not dominated:
+            front.append(run)
+    return sorted(front, key=lambda run: run["metrics"][cost_metric])
+
+def select_model(runs, accuracy_metric="accuracy", cost_metric="single_row_latency_ms", tolerance=0.005):
+    """
+    Selects the cheapest run within tolerance of the best accuracy.
+
+    Returns:
+        tuple: Selected run, best-accuracy run and the Pareto front.
+    """
+    runs = [run for run in runs
+            if run["metrics"].get(accuracy_metric) is not None and run["metrics"].get(cost_metric) is not None]
+    if not runs:
+        raise ValueError(f"No experiments report both {accuracy_metric} and {cost_metric}")
+    
+    best = max(runs, key=lambda run: run["metrics"][accuracy_metric])
+    threshold = best["metrics"][accuracy_metric] - tolerance
+    eligible = [run for run in runs if run["metrics"][accuracy_metric] >= threshold]
+    selected = min(eligible, key=lambda run: (run["metrics"][cost_metric], -run["metrics"][accuracy_metric]))
+    return selected, best, pareto_front(runs, accuracy_metric, cost_metric)
+
+def main():
+    parser = argparse.ArgumentParser(description="Select the cheapest experiment within a tolerance of the best accuracy")
+    parser.add_argument("--input", help="Saved `dvc exp show --json` output (runs dvc when omitted)")
+    parser.add_argument("--accuracy", default="accuracy", help="Accuracy metric to maximize")
+    parser.add_argument("--cost", default="single_row_latency_ms", choices=COST_METRICS, help="Cost metric to minimize")
+    parser.add_argument("--tolerance", type=float, default=0.005, help="Allowed accuracy loss versus the best run")
+    parser.add_argument("--output", help="Write the selection and Pareto front to this JSON file")
+    args = parser.parse_args()
+
+    runs = collect_runs(load_experiments(args.input))
+    selected, best, front = select_model(runs, args.accuracy, args.cost, args.tolerance)
+
+    print(f"Pareto front ({args.accuracy} vs {args.cost}):")
+    print(f"{'experiment':<30} {args.accuracy:>10} {args.cost:>22} {'n_trees':>8} {'max_depth':>10}")
+    for run in front:
+        marker = " <- selected" if run is selected else ""
+        print(f"{run['name']:<30} {run['metrics'][args.accuracy]:>10.4f} {run['metrics'][args.cost]:>22.3f} "
+              f"{str(run['params'].get('model.n_estimators', '')):>8} {str(run['params'].get('model.max_depth', '')):>10}{marker}")
+    
+    print(f"\nBest accuracy: {best['name']} ({best['metrics'][args.accuracy]:.4f}, "
+          f"{args.cost}={best['metrics'][args.cost]:.3f})")
+    print(f"Selected: {selected['name']} ({selected['metrics'][args.accuracy]:.4f}, "
+          f"{args.cost}={selected['metrics'][args.cost]:.3f}) within tolerance {args.tolerance}")
+    print(f"Apply it with: dvc exp apply {selected['name']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"selected": selected, "best_accuracy": best, "pareto_front": front,
+                       "cost_metric": args.cost, "tolerance": args.tolerance}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
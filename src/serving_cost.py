@@ -0,0 +1,49 @@
+import os
+import pickle
+import time
+import warnings
+import numpy as np
+
+def median_ms(fn, repeats):
+    """Median wall time of fn() over repeats calls, in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+def measure_serving_cost(model_path, X, repeats=20, batch_size=1000, random_state=42):
+    """
+    Measures what a saved model costs to serve.
+
+    Args:
+        model_path: Path of the pickled model.
+        X: Feature rows to predict on; resampled to build the batch.
+        repeats: Number of timed repetitions per measurement.
+        batch_size: Rows in the batch latency measurement.
+
+    Returns:
+        dict: Serialized size, load time and single-row / batch predict_proba latency.
+    """
+    def load():
+        with open(model_path, "rb") as f:
+            return pickle.load(f)
+
+    model = load()
+    X = np.asarray(X, dtype=np.float32)
+    rng = np.random.default_rng(random_state)
+    single_row = X[:1]
+    batch = X[rng.integers(0, len(X), size=batch_size)]
+
+    # Time the NumPy path the API uses, without the feature-name warning on every call
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        return {
+            "model_size_bytes": int(os.path.getsize(model_path)),
+            "n_trees": int(len(model.estimators_)),
+            "load_time_ms": median_ms(load, max(1, repeats // 4)),
+            "single_row_latency_ms": median_ms(lambda: model.predict_proba(single_row), repeats),
+            "batch_size": int(batch_size),
+            "batch_latency_ms": median_ms(lambda: model.predict_proba(batch), max(1, repeats // 4))
+        }
@@ -0,0 +1,98 @@
+"""
+Generates synthetic crop recommendation data with the schema of the source CSV
+
+Rows are drawn per crop from independent normal distributions whose means
+and spreads approximate the per-class statistics of Crop_recommendation.csv,
+clipped to the dataset's value ranges. Classes are balanced, as in the real
+data. Large files are written in chunks, so memory use does not depend on the
+row count.
+
+Usage:
+    python src/synthetic_data.py --rows 1000000 --output data/synthetic_1m.csv
+"""
+import argparse
+import numpy as np
+import pandas as pd
+
+FEATURES = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]
+
+# Per-crop (mean, std) of each feature, in FEATURES order
+CLASS_PROFILES = {
+    "rice":        [(80, 12), (48, 8), (40, 3), (23.7, 2.0), (82.3, 1.4), (6.4, 0.8), (236, 35)],
+    "maize":       [(78, 12), (48, 8), (20, 3), (22.4, 2.7), (65.1, 5.6), (6.2, 0.4), (85, 12)],
+    "chickpea":    [(40, 12), (68, 7), (80, 3), (18.9, 1.1), (16.9, 1.7), (7.3, 0.8), (80, 11)],
+    "kidneybeans": [(21, 12), (68, 7), (20, 3), (20.1, 2.6), (21.6, 2.1), (5.7, 0.1), (106, 28)],
+    "pigeonpeas":  [(21, 12), (68, 7), (20, 3), (27.7, 5.8), (48.1, 11.0), (5.8, 0.6), (150, 34)],
+    "mothbeans":   [(21, 11), (48, 7), (20, 3), (28.2, 3.4), (53.2, 5.7), (6.8, 1.6), (51, 7)],
+    "mungbean":    [(21, 11), (47, 8), (20, 3), (28.5, 1.0), (85.5, 1.9), (6.7, 0.3), (48, 7)],
+    "blackgram":   [(40, 12), (68, 7), (19, 3), (30.0, 2.9), (65.1, 3.0), (7.1, 0.4), (68, 4)],
+    "lentil":      [(19, 12), (68, 7), (19, 3), (24.5, 3.1), (64.8, 3.2), (6.9, 0.5), (46, 6)],
+    "pomegranate": [(19, 12), (19, 8), (40, 3), (21.8, 2.1), (90.1, 2.9), (6.4, 0.3), (108, 4)],
+    "banana":      [(100, 11), (82, 8), (50, 3), (27.4, 1.4), (80.4, 2.8), (6.0, 0.3), (105, 9)],
+    "mango":       [(20, 11), (27, 8), (30, 3), (31.2, 2.5), (50.2, 3.2), (5.8, 0.7), (95, 4)],
+    "grapes":      [(23, 12), (133, 7), (200, 3), (23.8, 9.6), (81.9, 1.1), (6.0, 0.3), (70, 3)],
+    "watermelon":  [(99, 12), (17, 8), (50, 3), (25.6, 0.6), (85.2, 2.9), (6.5, 0.3), (51, 7)],
+    "muskmelon":   [(100, 12), (18, 7), (50, 3), (28.7, 0.9), (92.3, 1.4), (6.4, 0.3), (25, 3)],
+    "apple":       [(21, 12), (134, 8), (200, 3), (22.6, 0.9), (92.3, 1.5), (5.9, 0.3), (113, 7)],
+    "orange":      [(20, 11), (17, 8), (10, 3), (22.8, 8.0), (92.2, 1.5), (7.0, 0.6), (110, 6)],
+    "papaya":      [(50, 6), (59, 6), (50, 3), (33.7, 5.6), (92.4, 1.4), (6.7, 0.2), (143, 57)],
+    "coconut":     [(22, 11), (17, 8), (31, 3), (27.4, 1.2), (94.8, 2.6), (6.0, 0.3), (176, 29)],
+    "cotton":      [(118, 12), (46, 7), (20, 3), (24.0, 1.1), (79.8, 3.0), (6.9, 0.5), (80, 11)],
+    "jute":        [(78, 12), (47, 7), (40, 3), (25.0, 1.2), (79.6, 5.8), (6.7, 0.4), (175, 15)],
+    "coffee":      [(101, 11), (29, 7), (30, 3), (25.5, 1.5), (58.9, 5.9), (6.8, 0.4), (158, 31)]
+}
+
+# Observed value range of each feature in the source data
+FEATURE_RANGES = {
+    "N": (0, 140), "P": (5, 145), "K": (5, 205), "temperature": (8.8, 43.7),
+    "humidity": (14.3, 100), "ph": (3.5, 9.9), "rainfall": (20.2, 298.6)
+}
+
+# Decimal places of each column in the source CSV (N, P, K are integers)
+DECIMALS = {"N": 0, "P": 0, "K": 0, "temperature": 6, "humidity": 6, "ph": 6, "rainfall": 6}
+
+def generate(n_rows, random_state=42):
+    """
+    Draws a balanced synthetic dataset.
+
+    Args:
+        n_rows (int): Number of rows.
+        random_state (int): Seed for the generator.
+
+    Returns:
+        pd.DataFrame: Features and label in the column order of the source CSV.
+    """
+    rng = np.random.default_rng(random_state)
+    labels = np.array(list(CLASS_PROFILES))
+    means = np.array([[mean for mean, _ in profile] for profile in CLASS_PROFILES.values()])
+    stds = np.array([[std for _, std in profile] for profile in CLASS_PROFILES.values()])
+
+    label_idx = rng.permutation(np.arange(n_rows) % len(labels))
+    values = rng.normal(means[label_idx], stds[label_idx])
+    low, high = zip(*(FEATURE_RANGES[name] for name in FEATURES))
+    values = np.clip(values, low, high)
+
+    df = pd.DataFrame(values, columns=FEATURES)
+    df = df.round(DECIMALS).astype({"N": np.int64, "P": np.int64, "K": np.int64})
+    df["label"] = labels[label_idx]
+    return df
+
+def write_csv(n_rows, output_file, random_state=42, chunk_rows=1_000_000):
+    """Write n_rows of synthetic data to a CSV, generating at most chunk_rows at a time"""
+    for i, start in enumerate(range(0, n_rows, chunk_rows)):
+        chunk = generate(min(chunk_rows, n_rows - start), random_state=random_state + i)
+        chunk.to_csv(output_file, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    return output_file
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic crop recommendation data")
+    parser.add_argument("--rows", type=int, required=True, help="Number of rows to generate")
+    parser.add_argument("--output", default="data/synthetic.csv", help="CSV file to write")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    write_csv(args.rows, args.output, random_state=args.seed)
+    print(f"Wrote {args.rows} synthetic rows to {args.output}")
+
+if __name__ == "__main__":
+    main()